@@ -4,4 +4,8 @@ import os
 class ChatConfig(AppConfig):
     name = "chat"
     path = os.path.dirname(os.path.abspath(__file__))
-    verbose_name = "Chat"
\ No newline at end of file
+    verbose_name = "Chat"
+
+    def ready(self):
+        # Import signal handlers
+        from . import signals
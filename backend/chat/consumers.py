@@ -1,12 +1,20 @@
 import json
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .serializers import MessageSerializer
+from notifications.fanout import group_send_many
+from .persistence import load_participants, message_events, save_message
 from django.contrib.auth.models import AnonymousUser
 
+# Сколько сокет доверяет закешированному составу беседы (сек).
+# Изменения состава сбрасывают кеш сразу (chat/signals.py), TTL — страховка.
+MEMBERSHIP_TTL = 60
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope.get("user")
+        # {conversation_id: ({id: участник}, время загрузки)}
+        self.memberships = {}
 
         if not self.user or self.user.is_anonymous or isinstance(self.user, AnonymousUser):
             await self.close(code=4001)
@@ -47,29 +55,25 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.send(text_data=json.dumps({"type": "error", "message": "Необходимо указать conversation_id и content"}))
                 return
 
-            # Проверка участия в беседе
-            if not await self.check_conversation_participant(conversation_id):
+            try:
+                conversation_id = int(conversation_id)
+            except (TypeError, ValueError):
                 await self.send(text_data=json.dumps({"type": "error", "message": "Вы не участник этой беседы"}))
                 return
 
-            message = await self.save_message(conversation_id, content)
-            if not message:
+            # проверка участия, сохранение и сериализация — один переход в поток БД
+            try:
+                result = await self.persist_message(conversation_id, content)
+            except Exception as e:
+                print(f"Error saving message: {e}")
                 await self.send(text_data=json.dumps({"type": "error", "message": "Не удалось сохранить сообщение"}))
                 return
+            if result is None:
+                await self.send(text_data=json.dumps({"type": "error", "message": "Вы не участник этой беседы"}))
+                return
 
-            serialized = await self.serialize_message(message)
-            recipients = await self.get_participants(conversation_id)
-
-            for participant in recipients:
-                group_name = f"chat_{participant.id}"
-                print(f"[DEBUG] Sending to group: {group_name} — data: {serialized}")
-                await self.channel_layer.group_send(
-                    group_name,
-                    {
-                        "type": "chat_message",
-                        "message": serialized
-                    }
-                )
+            # в личные группы участников: чат-сокеты и сокеты уведомлений получателей
+            await group_send_many(self.channel_layer, result)
 
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({"type": "error", "message": "Неверный формат JSON"}))
@@ -83,47 +87,52 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 "type": "chat_message",
                 "message": event["message"]
             }))
+            await self.send_unread_counts(event.get("unread"))
         except Exception as e:
             print(f"Ошибка при отправке сообщения клиенту: {e}")
 
-    @database_sync_to_async
-    def check_conversation_participant(self, conversation_id):
-        try:
-            from .models import Conversation
-            conversation = Conversation.objects.get(id=conversation_id)
-            return conversation.participants.filter(id=self.user.id).exists()
-        except:
-            return False
+    async def chat_read(self, event):
+        # отметка о прочтении (chat.persistence.mark_conversation_read)
+        await self.send(text_data=json.dumps({
+            "type": "read_receipt",
+            "conversation_id": event["conversation_id"],
+            "reader_id": event["reader_id"],
+        }))
+        await self.send_unread_counts(event.get("unread"))
 
-    @database_sync_to_async
-    def save_message(self, conversation_id, content):
-        try:
-            from .models import Conversation, Message
-            conv = Conversation.objects.get(id=conversation_id)
-            msg = Message.objects.create(
-                conversation=conv,
-                sender=self.user,
-                content=content
-            )
-            conv.save()
-            return msg
-        except Exception as e:
-            print(f"Error saving message: {e}")
-            return None
+    async def unread_counts(self, event):
+        # счётчики изменились вне бесед (уведомления прочитаны, notifications/views.py)
+        await self.send_unread_counts(event["counts"])
+
+    async def send_unread_counts(self, counts):
+        if counts is not None:
+            await self.send(text_data=json.dumps({"type": "unread_counts", **counts}))
+
+    async def chat_membership(self, event):
+        # состав беседы изменился (chat/signals.py)
+        self.memberships.pop(event["conversation_id"], None)
 
-    @database_sync_to_async
     def get_participants(self, conversation_id):
-        try:
-            from .models import Conversation
-            conversation = Conversation.objects.get(id=conversation_id)
-            return list(conversation.participants.all())
-        except:
-            return []
+        cached = self.memberships.get(conversation_id)
+        if cached is not None and time.monotonic() - cached[1] < MEMBERSHIP_TTL:
+            return cached[0]
+        participants = load_participants(conversation_id)
+        # чужие и несуществующие беседы не кешируем: пользователя могут добавить
+        if self.user.id in participants:
+            self.memberships[conversation_id] = (participants, time.monotonic())
+        return participants
 
     @database_sync_to_async
-    def serialize_message(self, message):
-        try:
-            return MessageSerializer(message).data
-        except Exception as e:
-            print(f"Error serializing message: {e}")
+    def persist_message(self, conversation_id, content):
+        """
+        Возвращает события для личных групп участников (сообщение и
+        уведомления получателям) или None, если пользователь не участник.
+        Состав беседы — из кеша соединения, так что обычно это только
+        INSERT, UPDATE и bulk_create уведомлений в одной транзакции.
+        """
+        participants = self.get_participants(conversation_id)
+        if self.user.id not in participants:
             return None
+        message, notifications, unread = save_message(conversation_id, self.user, content, participants)
+        _, events = message_events(message, notifications, participants, unread)
+        return events
@@ -4,6 +4,11 @@ from django.conf import settings
 class Conversation(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
     listing = models.ForeignKey('listings.Listing', on_delete=models.CASCADE, related_name='conversations', null=True, blank=True)
+    # Проставляется вместе с updated_at при каждом сообщении (chat/persistence.py),
+    # чтобы список бесед не искал последнее сообщение по истории каждой
+    last_message = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, related_name='+', null=True, blank=True, editable=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -22,6 +27,12 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # история беседы keyset-страницами (chat/pagination.py)
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_created_idx'),
+            # непрочитанных мало: счётчики списка бесед читают только этот индекс
+            models.Index(fields=['conversation', 'sender'], condition=models.Q(is_read=False), name='message_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} at {self.created_at}"
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MessageHistoryPagination(BasePagination):
+    """
+    Keyset-пагинация истории беседы по id сообщения:
+    без параметров — последние сообщения, новые первыми;
+    ?before=<id> — предыдущая (более старая) страница, новые первыми;
+    ?since=<id> — только сообщения после id, по порядку (старые первыми),
+    чтобы клиент дописал их в конец ленты.
+    Позиция — пара (created_at, id) по индексу (conversation, created_at, id).
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'limit'
+    before_query_param = 'before'
+    since_query_param = 'since'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        before = self.get_message_id(request, self.before_query_param)
+        since = self.get_message_id(request, self.since_query_param)
+        if before is not None and since is not None:
+            raise ValidationError({'before': 'before и since вместе не поддерживаются'})
+
+        self.since_mode = since is not None
+        cursor = before if before is not None else since
+        if self.since_mode:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_q(queryset, cursor, descending=not self.since_mode))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.cursor = cursor
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.since_mode:
+            # новых сообщений может не быть: клиент опрашивает с прежним since
+            if not self.page:
+                return None
+            url = remove_query_param(self.base_url, self.before_query_param)
+            return replace_query_param(url, self.since_query_param, self.page[-1].pk)
+        if not self.has_more:
+            return None
+        return replace_query_param(self.base_url, self.before_query_param, self.page[-1].pk)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    @staticmethod
+    def get_message_id(request, param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: 'Ожидается id сообщения'})
+
+    @staticmethod
+    def keyset_q(queryset, message_id, descending):
+        created_at = queryset.filter(pk=message_id).values_list('created_at', flat=True).first()
+        if created_at is None:
+            raise NotFound('Сообщение не найдено в этой беседе')
+        op = 'lt' if descending else 'gt'
+        # лишнее created_at <= / >= даёт планировщику диапазон по индексу
+        bound = 'lte' if descending else 'gte'
+        return Q(**{f'created_at__{bound}': created_at}) & (
+            Q(**{f'created_at__{op}': created_at}) | Q(created_at=created_at, **{f'id__{op}': message_id})
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': {'type': 'integer'},
+            }
+            for param, description in (
+                (self.before_query_param, 'Сообщения старше этого id (новые первыми)'),
+                (self.since_query_param, 'Сообщения новее этого id (старые первыми)'),
+                (self.page_size_query_param, f'Размер страницы, до {self.max_page_size}'),
+            )
+        ]
@@ -0,0 +1,126 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from notifications.fanout import group_send_many
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from notifications.unread import conversation_read, message_created
+from .models import Message, Conversation
+from .serializers import MessageSerializer
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+Participant = Conversation.participants.through
+
+
+def load_participant_ids(conversation_id):
+    """id участников беседы одним запросом к таблице связи (без JOIN бесед)."""
+    return frozenset(
+        Participant.objects.filter(conversation_id=conversation_id).values_list('user_id', flat=True)
+    )
+
+
+def load_participants(conversation_id):
+    """Участники беседы {id: User} одним запросом — для проверки участия и уведомлений."""
+    return {user.pk: user for user in User.objects.filter(conversations=conversation_id)}
+
+
+def save_message(conversation_id, sender, content, participants=None):
+    """
+    Сохраняет сообщение, сдвигает updated_at и last_message беседы и создаёт уведомления
+    остальным участникам в одной транзакции: INSERT + UPDATE + один
+    bulk_create, без чтения беседы и её полного пересохранения.
+    sender и получатели уже подставлены — сериализаторы не ходят в БД.
+    Следом увеличивает счётчики непрочитанного получателей в Redis.
+    Возвращает (message, notifications, {user_id: новые счётчики}).
+    """
+    if participants is None:
+        participants = load_participants(conversation_id)
+    with transaction.atomic():
+        message = Message.objects.create(conversation_id=conversation_id, sender=sender, content=content)
+        Conversation.objects.filter(pk=conversation_id).update(updated_at=message.created_at, last_message=message)
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient=recipient,
+                sender=sender,
+                notification_type='message',
+                content=f'Вы получили новое сообщение от {sender.username}',
+                object_id=conversation_id,
+            )
+            for recipient_id, recipient in participants.items()
+            if recipient_id != sender.pk
+        ])
+    unread = message_created(conversation_id, [notification.recipient_id for notification in notifications])
+    return message, notifications, unread
+
+
+def mark_conversation_read(conversation_id, user):
+    """
+    Помечает входящие сообщения беседы и уведомления о них прочитанными
+    (по одному UPDATE), обнуляет счётчик беседы и рассылает отметку о
+    прочтении в чат-сокеты участников. Возвращает число прочитанных сообщений.
+    """
+    with transaction.atomic():
+        read = (
+            Message.objects.filter(conversation_id=conversation_id, is_read=False)
+            .exclude(sender=user)
+            .update(is_read=True)
+        )
+        notifications_read = Notification.objects.filter(
+            recipient=user, notification_type='message', object_id=conversation_id, is_read=False,
+        ).update(is_read=True)
+    if read or notifications_read:
+        counts = conversation_read(user.pk, conversation_id, notifications_read)
+        publish(read_events(conversation_id, user.pk, counts, load_participant_ids(conversation_id)))
+    return read
+
+
+def message_events(message, notifications, participant_ids, unread=None):
+    """
+    События о новом сообщении в личные группы: чат-сокетам участников —
+    сообщение (получателям — с их новыми счётчиками непрочитанного),
+    сокетам уведомлений получателей — их уведомление.
+    Возвращает (сериализованное сообщение, [(группа, событие), ...]).
+    """
+    unread = unread or {}
+    serialized = MessageSerializer(message).data
+    events = [
+        (f"chat_{user_id}", {"type": "chat_message", "message": serialized, "unread": unread.get(user_id)})
+        for user_id in participant_ids
+    ]
+    data = NotificationSerializer(notifications, many=True).data
+    events += [
+        (f"notifications_{notification.recipient_id}", {"type": "notification", "notification": payload})
+        for notification, payload in zip(notifications, data)
+    ]
+    return serialized, events
+
+
+def read_events(conversation_id, reader_id, counts, participant_ids):
+    """Отметка о прочтении в чат-сокеты участников; читателю — и его новые счётчики."""
+    return [
+        (f"chat_{user_id}", {
+            "type": "chat.read",
+            "conversation_id": conversation_id,
+            "reader_id": reader_id,
+            "unread": counts if user_id == reader_id else None,
+        })
+        for user_id in participant_ids
+    ]
+
+
+def publish(events):
+    """Рассылка событий из синхронного кода (REST) одним заходом в event loop."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not events:
+        return
+    try:
+        async_to_sync(group_send_many)(channel_layer, events)
+    except Exception as e:
+        # данные уже в БД, клиенты догонят через ?since= и /unread-counts/
+        logger.warning(f"[chat] Publish failed: {e}")
@@ -1,22 +1,44 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import Conversation, Message
 from users.serializers import UserSerializer
-from listings.serializers import ListingSerializer
+from listings.models import Listing
 
 class MessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
-    conversation_id = serializers.IntegerField(source='conversation.id', read_only=True)
+    conversation_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Message
         fields = ('id', 'conversation_id', 'sender', 'content', 'is_read', 'created_at')
         read_only_fields = ('id', 'sender', 'created_at')
 
+class ConversationListingSerializer(serializers.ModelSerializer):
+    """Карточка объявления в беседе: без картинок/видео/владельца целиком."""
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Listing
+        fields = ('id', 'slug', 'title', 'price', 'currency', 'status', 'image')
+
+    def get_image(self, obj):
+        # primary_image подставляет inbox-запрос (chat/views.py), иначе — запрос на карточку
+        if hasattr(obj, 'primary_image'):
+            name = obj.primary_image
+        else:
+            name = obj.images.order_by('-is_primary', 'id').values_list('image', flat=True).first()
+        return default_storage.url(name) if name else None
+
 class ConversationSerializer(serializers.ModelSerializer):
+    """
+    Без запросов на беседу, если queryset собран ConversationViewSet.inbox_queryset:
+    last_message — денормализованный FK, unread_count и картинка объявления —
+    аннотации, участники — prefetch.
+    """
     participants = UserSerializer(many=True, read_only=True)
     last_message = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
-    listing = ListingSerializer(read_only=True)
+    listing = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
@@ -24,15 +46,25 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
     
     def get_last_message(self, obj):
-        message = obj.messages.last()
+        message = obj.last_message
         if message:
             return MessageSerializer(message).data
         return None
     
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread'):
+            return obj.unread
         user = self.context['request'].user
         return obj.messages.filter(is_read=False).exclude(sender=user).count()
 
+    def get_listing(self, obj):
+        listing = obj.listing
+        if listing is None:
+            return None
+        if hasattr(obj, 'listing_image'):
+            listing.primary_image = obj.listing_image
+        return ConversationListingSerializer(listing).data
+
 class ConversationCreateSerializer(serializers.ModelSerializer):
     participant_id = serializers.IntegerField(write_only=True)
     listing_id = serializers.IntegerField(write_only=True, required=False)
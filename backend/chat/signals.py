@@ -0,0 +1,57 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from .models import Conversation
+from .persistence import load_participant_ids
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_membership(conversation_ids, user_ids):
+    """
+    После коммита просит сокеты пользователей сбросить закешированный
+    состав бесед (ChatConsumer.chat_membership).
+    """
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        for user_id in user_ids:
+            for conversation_id in conversation_ids:
+                try:
+                    async_to_sync(channel_layer.group_send)(
+                        f"chat_{user_id}",
+                        {"type": "chat.membership", "conversation_id": conversation_id},
+                    )
+                except Exception as e:
+                    # у сокета есть TTL кеша, поэтому не валим запрос
+                    logger.warning(f"[chat] Membership invalidation failed: {e}")
+                    return
+
+    transaction.on_commit(send)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.conversations.add(...): instance — пользователь, pk_set — беседы
+        conversation_ids = pk_set or set(instance.conversations.values_list('pk', flat=True))
+        user_ids = {instance.pk}
+        for conversation_id in conversation_ids:
+            user_ids |= load_participant_ids(conversation_id)
+    else:
+        conversation_ids = {instance.pk}
+        user_ids = set(load_participant_ids(instance.pk)) | set(pk_set or ())
+    invalidate_membership(conversation_ids, user_ids)
+
+
+@receiver(pre_delete, sender=Conversation)
+def conversation_deleted(sender, instance, **kwargs):
+    invalidate_membership({instance.pk}, load_participant_ids(instance.pk))
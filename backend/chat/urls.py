@@ -6,5 +6,6 @@ router = DefaultRouter()
 router.register(r'conversations', views.ConversationViewSet, basename='conversation')
 
 urlpatterns = [
+    path('unread-counts/', views.UnreadCountsView.as_view(), name='unread-counts'),
     path('', include(router.urls)),
 ]
@@ -1,7 +1,14 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from notifications.unread import get_unread_counts
+from listings.models import ListingImage
 from .models import Conversation, Message
+from .pagination import MessageHistoryPagination
+from .persistence import load_participants, mark_conversation_read, message_events, publish, save_message
 from .serializers import ConversationSerializer, MessageSerializer, ConversationCreateSerializer
 
 class ConversationViewSet(viewsets.ModelViewSet):
@@ -9,7 +16,42 @@ class ConversationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Conversation.objects.filter(participants=self.request.user)
+        queryset = Conversation.objects.filter(participants=self.request.user)
+        if self.action in ['list', 'retrieve']:
+            return self.inbox_queryset(queryset)
+        return queryset
+
+    def inbox_queryset(self, queryset):
+        """
+        Всё для ConversationSerializer одним запросом на страницу плюс
+        prefetch участников: последнее сообщение с отправителем и
+        объявление — JOIN, непрочитанные — подзапрос по частичному
+        индексу message_unread_idx, картинка объявления — подзапрос.
+        """
+        user = self.request.user
+        unread = (
+            Message.objects.filter(conversation=OuterRef('pk'), is_read=False)
+            .exclude(sender=user)
+            .order_by()
+            .values('conversation')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        primary_image = (
+            ListingImage.objects.filter(listing=OuterRef('listing_id'))
+            .order_by('-is_primary', 'id')
+            .values('image')[:1]
+        )
+        return (
+            queryset
+            .select_related('listing', 'last_message__sender')
+            .defer('listing__description', 'listing__search_vector')
+            .annotate(
+                unread=Coalesce(Subquery(unread), 0),
+                listing_image=Subquery(primary_image),
+            )
+            .prefetch_related('participants')
+        )
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -25,20 +67,29 @@ class ConversationViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], pagination_class=MessageHistoryPagination)
     def messages(self, request, pk=None):
+        """
+        История беседы страницами (chat/pagination.py): ?before=<id> —
+        более старые, ?since=<id> — только новые. Входящие сообщения
+        помечаются прочитанными одним UPDATE; более старые страницы
+        (before) к этому моменту уже прочитаны и UPDATE не делают.
+        """
         conversation = self.get_object()
-        messages = conversation.messages.all()
-        
-        # Mark messages as read
-        unread_messages = messages.filter(is_read=False).exclude(sender=request.user)
-        for message in unread_messages:
-            message.is_read = True
-            message.save()
-        
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        if MessageHistoryPagination.before_query_param not in request.query_params:
+            mark_conversation_read(conversation.pk, request.user)
+
+        page = self.paginate_queryset(conversation.messages.select_related('sender'))
+        serializer = MessageSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Помечает беседу прочитанной без загрузки истории."""
+        conversation = self.get_object()
+        read = mark_conversation_read(conversation.pk, request.user)
+        return Response({'read': read})
+
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
         conversation = self.get_object()
@@ -50,14 +101,24 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=request.user,
-            content=content
-        )
-        
-        # Update conversation timestamp
-        conversation.save()
-        
-        serializer = MessageSerializer(message)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # сообщение, updated_at беседы и уведомления — одной транзакцией,
+        # рассылка — в личные группы участников, как в ChatConsumer
+        participants = load_participants(conversation.pk)
+        message, notifications, unread = save_message(conversation.pk, request.user, content, participants)
+        serialized, events = message_events(message, notifications, participants, unread)
+        publish(events)
+        return Response(serialized, status=status.HTTP_201_CREATED)
+
+
+class UnreadCountsView(APIView):
+    """
+    Бейджи непрочитанного из Redis одним HGETALL (notifications/unread.py):
+    {"messages", "conversations": {id: n}, "notifications"}. Изменения
+    приходят в чат-сокет событием unread_counts, опрашивать не нужно.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        response = Response(get_unread_counts(request.user.pk))
+        response['Cache-Control'] = 'private, no-cache'
+        return response
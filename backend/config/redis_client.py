@@ -0,0 +1,33 @@
+import logging
+import os
+
+import redis
+from redis.exceptions import LockNotOwnedError
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_redis():
+    """
+    Общий клиент Redis для счётчиков и кешей приложения
+    (тот же инстанс, что и у Celery/Channels).
+    """
+    global _client
+    if _client is None:
+        url = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+        _client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def release_lock(lock):
+    """
+    Отпускает lock периодической задачи. Если задача работала дольше
+    timeout, ключ уже истёк (или его взял следующий запуск): это не
+    повод ронять задачу после сделанной работы, только предупреждение.
+    """
+    try:
+        lock.release()
+    except LockNotOwnedError:
+        logger.warning(f"[redis] Lock {lock.name} expired before release")
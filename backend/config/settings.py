@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third party apps
     'rest_framework',
@@ -234,6 +235,40 @@ CELERY_BEAT_SCHEDULE = {
         'task':    'listings.tasks.delete_old_listings',
         'schedule': timedelta(days=1),
     },
+    'flush-listing-view-counts': {
+        'task':    'listings.tasks.flush_listing_view_counts',
+        'schedule': timedelta(seconds=30),
+    },
+    'refresh-belgian-cities-weekly': {
+        'task':    'listings.tasks.refresh_belgian_cities',
+        'schedule': timedelta(days=7),
+    },
+    'generate-listing-feeds-hourly': {
+        'task':    'listings.tasks.generate_listing_feeds',
+        'schedule': timedelta(hours=1),
+    },
+    'reconcile-unread-counters': {
+        'task':    'notifications.tasks.reconcile_unread_counters',
+        'schedule': timedelta(minutes=15),
+    },
+}
+
+# Просмотры объявлений копятся в Redis и сбрасываются в БД задачей выше.
+# > 0 — повторный просмотр того же посетителя в течение N секунд не считается
+LISTING_VIEW_DEDUP_SECONDS = int(os.getenv('LISTING_VIEW_DEDUP_SECONDS', 0))
+
+# Кеш ответов (анонимные ленты и карточки объявлений, listings/response_cache.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', os.getenv('REDIS_URL', 'redis://redis:6379/0')),
+        'KEY_PREFIX': 'haam',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'socket_timeout': 2,
+            'socket_connect_timeout': 2,
+        },
+    },
 }
 
 # Channels layer over Redis
@@ -315,7 +350,4 @@ SESSION_COOKIE_SECURE = False  # Отключаем для локальной р
 CSRF_COOKIE_SECURE    = False  # Отключаем для локальной разработки
 
 # Staticfiles via WhiteNoise
-#STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
-
-# Geonames username for Belgian cities API
-GEONAMES_USERNAME = os.getenv("GEONAMES_USERNAME")
\ No newline at end of file
+#STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
\ No newline at end of file
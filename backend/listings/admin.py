@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Category, Listing, ListingImage, ListingVideo, Favorite
+from .models import Category, Listing, ListingImage, ListingVideo, Favorite, SavedSearch
 
 
 class ListingImageInline(admin.TabularInline):
@@ -45,3 +45,11 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'listing', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'listing__title')
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('user', 'name', 'category', 'price_min', 'price_max', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('user__username', 'name')
+    readonly_fields = ('category', 'price_min', 'price_max', 'created_at')
@@ -7,3 +7,7 @@ class ListingsConfig(AppConfig):
     # не хардкодим путь, а вычисляем его по __file__
     path = os.path.dirname(os.path.abspath(__file__))
     verbose_name = "Listings"
+
+    def ready(self):
+        # Import signal handlers
+        from . import signals
@@ -0,0 +1,201 @@
+import codecs
+import csv
+import json
+import logging
+import re
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .category_tree import get_category_tree
+from .geo import geocode
+from .models import Listing
+from .response_cache import ALL_LISTINGS, bump, category_version
+from .tasks import fetch_listing_images, match_saved_searches
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Строк на одну транзакцию: валидация, один запрос за slug'ами, один INSERT
+IMPORT_BATCH_SIZE = 500
+MAX_IMAGES_PER_LISTING = 10
+MAX_REPORTED_ERRORS = 1000
+
+_url_separator = re.compile(r'[\s|]+')
+
+
+class ListingImportRowSerializer(serializers.Serializer):
+    """
+    Одна строка импорта. Категория — id или slug (по дереву категорий
+    в памяти, без запросов); картинки — ссылки, скачиваются в фоне.
+    """
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    currency = serializers.CharField(max_length=3, required=False)
+    category = serializers.IntegerField(required=False)
+    category_slug = serializers.CharField(required=False)
+    location = serializers.CharField(max_length=255)
+    image_urls = serializers.ListField(
+        child=serializers.URLField(), required=False, max_length=MAX_IMAGES_PER_LISTING,
+    )
+
+    def validate(self, attrs):
+        tree = self.context['category_tree']
+        slug = attrs.pop('category_slug', None)
+        category_id = attrs.pop('category', None)
+        if category_id is None and slug:
+            category_id = self.context['category_slugs'].get(slug.lower())
+        if category_id is None or tree.get(category_id) is None:
+            raise serializers.ValidationError({'category': 'Неизвестная категория'})
+        attrs['category_id'] = category_id
+        return attrs
+
+
+def _decode(stream):
+    # построчно, без чтения всего тела/файла в память; BOM из Excel отбрасываем
+    return codecs.iterdecode(stream, 'utf-8-sig')
+
+
+def iter_rows(stream, fmt):
+    """
+    Строки импорта из бинарного потока (файл, тело запроса, upload):
+    (номер строки данных, dict или None при ошибке разбора, ошибка).
+    """
+    lines = _decode(stream)
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            # пустые ячейки CSV = поле не задано
+            row = {key: value for key, value in row.items() if key and value not in (None, '')}
+            if 'image_urls' in row:
+                row['image_urls'] = [url for url in _url_separator.split(row['image_urls']) if url]
+            yield number, row, None
+    elif fmt == 'jsonl':
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield number, None, 'Expected a JSON object'
+                continue
+            yield number, row, None
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def _insert(listings):
+    """bulk_create пачки; при гонке за slug с параллельной вставкой — заново."""
+    for attempt in range(Listing.SLUG_ALLOCATION_ATTEMPTS):
+        slugs = Listing.allocate_slugs([listing.title for listing in listings])
+        for listing, slug in zip(listings, slugs):
+            listing.slug = slug
+        try:
+            with transaction.atomic():
+                return Listing.objects.bulk_create(listings)
+        except IntegrityError as e:
+            if 'slug' not in str(e) or attempt == Listing.SLUG_ALLOCATION_ATTEMPTS - 1:
+                raise
+
+
+class ListingImporter:
+    """
+    Потоковый импорт объявлений владельца: строки копятся в пачки по
+    batch_size, каждая пачка валидируется и вставляется одним bulk_create
+    в своей транзакции. Ошибки строк — валидации и ограничений БД — не
+    останавливают импорт и попадают в отчёт с номером строки.
+    """
+
+    def __init__(self, owner, batch_size=IMPORT_BATCH_SIZE, max_rows=None):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.truncated = False
+        tree = get_category_tree()
+        # один экземпляр на весь импорт: поля сериализатора строятся один раз,
+        # это в разы быстрее, чем новый сериализатор на каждую строку
+        self.row_serializer = ListingImportRowSerializer(context={
+            'category_tree': tree,
+            'category_slugs': {node['slug'].lower(): node['id'] for node in tree.nodes.values()},
+        })
+
+    def run(self, stream, fmt):
+        batch = []
+        for number, row, error in iter_rows(stream, fmt):
+            if self.max_rows is not None and number > self.max_rows:
+                self.truncated = True
+                break
+            if error:
+                self.add_error(number, {'non_field_errors': [error]})
+                continue
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def add_error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def import_batch(self, batch):
+        rows = []
+        for number, row in batch:
+            try:
+                data = dict(self.row_serializer.run_validation(row))
+            except serializers.ValidationError as e:
+                self.add_error(number, e.detail)
+                continue
+            urls = data.pop('image_urls', [])
+            listing = Listing(owner=self.owner, **data)
+            # bulk_create не вызывает save(): координаты — сразу из справочника
+            listing.latitude, listing.longitude = geocode(listing.location) or (None, None)
+            rows.append((number, listing, urls))
+        if not rows:
+            return
+
+        try:
+            with transaction.atomic():
+                self.insert_listings([listing for _, listing, _ in rows], [urls for _, _, urls in rows])
+        except IntegrityError as e:
+            # строку, нарушившую ограничение БД, не найти по ошибке пачки:
+            # вставляем по одной и отчитываемся о каждой отдельно
+            logger.warning(f"[import] Owner {self.owner.pk}: batch rejected ({e}), inserting row by row")
+            for number, listing, urls in rows:
+                try:
+                    with transaction.atomic():
+                        self.insert_listings([listing], [urls])
+                except IntegrityError:
+                    self.add_error(number, {'non_field_errors': ['Строка нарушает ограничения базы данных']})
+        logger.info(f"[import] Owner {self.owner.pk}: {self.created} listings created, {self.failed} rows failed")
+
+    def insert_listings(self, listings, image_urls):
+        """Вставка в текущей транзакции + фоновые задачи после её коммита."""
+        created = _insert(listings)
+        categories = {listing.category_id for listing in created}
+        # bulk_create не шлёт сигналы: версии кеша, сохранённые поиски и картинки — после коммита
+        transaction.on_commit(lambda: bump(ALL_LISTINGS, *(category_version(pk) for pk in categories)))
+        transaction.on_commit(lambda: match_saved_searches.delay([listing.pk for listing in created]))
+        for listing, urls in zip(created, image_urls):
+            if urls:
+                transaction.on_commit(lambda pk=listing.pk, urls=urls: fetch_listing_images.delay(pk, urls))
+        self.created += len(created)
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'truncated': self.truncated,
+        }
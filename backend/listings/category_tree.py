@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+from .models import Category
+from .versioned_cache import VersionedCache
+
+VERSION_KEY = 'category_tree:version'
+# Как часто процесс сверяет свою копию дерева с версией в Redis (сек)
+CHECK_INTERVAL = 5
+
+
+class CategoryTree:
+    """
+    Всё дерево категорий, собранное одним запросом. Узлы — готовые
+    словари в формате CategorySerializer (id, name, parent, icon, slug,
+    children), их нельзя изменять: они общие для всех запросов процесса.
+    """
+
+    def __init__(self, rows):
+        self.nodes = {}
+        for row in rows:
+            self.nodes[row['id']] = {
+                'id': row['id'],
+                'name': row['name'],
+                'parent': row['parent_id'],
+                'icon': row['icon'],
+                'slug': row['slug'],
+                'children': [],
+            }
+        self.roots = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node['parent'])
+            (parent['children'] if parent else self.roots).append(node)
+        payload = json.dumps(self.roots, sort_keys=True, ensure_ascii=False)
+        self.etag = hashlib.md5(payload.encode()).hexdigest()
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+
+def _build_tree():
+    rows = Category.objects.order_by('id').values('id', 'name', 'parent_id', 'icon', 'slug')
+    return CategoryTree(list(rows))
+
+
+_cache = VersionedCache(VERSION_KEY, _build_tree, CHECK_INTERVAL, 'categories')
+
+
+def get_category_tree():
+    return _cache.get()
+
+
+def invalidate_category_tree():
+    """
+    Поднимает версию дерева: этот процесс перечитает его сразу,
+    остальные — не позже чем через CHECK_INTERVAL.
+    """
+    _cache.invalidate()
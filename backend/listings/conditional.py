@@ -0,0 +1,69 @@
+import hashlib
+from collections import namedtuple
+
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .category_tree import get_category_tree
+from .models import Listing, ListingImage, ListingVideo
+
+ListingValidators = namedtuple('ListingValidators', 'pk etag')
+
+
+def _latest(model, field):
+    return Subquery(
+        model.objects.filter(listing=OuterRef('pk'))
+        .order_by().values('listing')
+        .annotate(latest=Max(field)).values('latest')
+    )
+
+
+def listing_validators(slug, user):
+    """
+    ETag карточки одним запросом, без сериализации: updated_at
+    объявления, последние изменения картинок/видео, флаг избранного
+    пользователя и версия дерева категорий (category_detail).
+    Удаление медиа трогает updated_at объявления (см. signals.py).
+    view_count в валидаторы не входит: иначе каждый сброс счётчиков
+    просмотров ломал бы 304 у самых популярных карточек. Поэтому ETag
+    слабый (W/): тела с разным view_count семантически равны, счётчик
+    в закешированной клиентом версии может немного отставать — как и в
+    кеше ответов. Last-Modified не отдаём: у дерева категорий нет
+    отметки времени, и If-Modified-Since пропускал бы его изменения.
+    None, если объявления нет.
+    """
+    authenticated = user is not None and user.is_authenticated
+    fields = ['pk', 'updated_at', 'images_updated', 'videos_updated']
+    if authenticated:
+        fields.append('is_favorited')
+    row = (
+        Listing.objects.filter(slug=slug)
+        .with_is_favorited(user)
+        .annotate(
+            images_updated=_latest(ListingImage, 'updated_at'),
+            videos_updated=_latest(ListingVideo, 'created_at'),
+        )
+        .values(*fields)
+        .first()
+    )
+    if row is None:
+        return None
+    raw = '|'.join(str(row[field]) for field in fields) + f'|{get_category_tree().etag}'
+    etag = f'W/"listing-{hashlib.md5(raw.encode()).hexdigest()}"'
+    return ListingValidators(row['pk'], etag)
+
+
+def not_modified(request, validators):
+    """304 (или 412), если у клиента актуальная версия, иначе None."""
+    response = get_conditional_response(request, etag=validators.etag)
+    if response is not None:
+        set_validators(response, validators, request.user)
+    return response
+
+
+def set_validators(response, validators, user):
+    response['ETag'] = validators.etag
+    # клиент переспрашивает каждый раз, но с If-None-Match получает пустой 304
+    patch_cache_control(response, no_cache=True, **({'private': True} if user.is_authenticated else {'public': True}))
+    patch_vary_headers(response, ['Authorization'])
+    return response
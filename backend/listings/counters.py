@@ -0,0 +1,85 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from redis import RedisError, ResponseError
+
+from config.redis_client import get_redis
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'listing_views:pending'
+FLUSHING_KEY = 'listing_views:flushing'
+SEEN_KEY = 'listing_views:seen:{listing_id}:{visitor}'
+
+
+def get_visitor_key(request):
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    ip = forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')
+    return f'ip{ip}'
+
+
+def record_view(listing_id, visitor=None):
+    """
+    Буферизует просмотр в Redis (HINCRBY), вместо UPDATE строки на каждый GET.
+    В БД счётчики переносит flush_view_counts. Возвращает True, если
+    просмотр засчитан (при включённой дедупликации повтор не считается).
+    """
+    dedup_seconds = settings.LISTING_VIEW_DEDUP_SECONDS
+    try:
+        client = get_redis()
+        if dedup_seconds and visitor:
+            key = SEEN_KEY.format(listing_id=listing_id, visitor=visitor)
+            if not client.set(key, 1, nx=True, ex=dedup_seconds):
+                return False
+        client.hincrby(PENDING_KEY, listing_id, 1)
+    except RedisError as e:
+        # Redis недоступен — считаем напрямую, просмотр не теряем
+        logger.warning(f"[views] Redis unavailable, writing view directly: {e}")
+        Listing.objects.filter(pk=listing_id).update(view_count=F('view_count') + 1)
+    return True
+
+
+def flush_view_counts():
+    """
+    Переносит накопленные просмотры в Listing.view_count пачками.
+    Буфер атомарно переименовывается, поэтому новые просмотры копятся
+    в свежем ключе; если воркер упал до UPDATE, FLUSHING_KEY добирается
+    в следующий раз. Ключ удаляется последним шагом транзакции, перед
+    коммитом: уже применённые просмотры повторно не прибавляются, а при
+    ошибке коммита возвращаются в буфер. Вызывать под локом (tasks.py).
+    Возвращает число обновлённых объявлений.
+    """
+    client = get_redis()
+    if not client.exists(FLUSHING_KEY):
+        try:
+            client.rename(PENDING_KEY, FLUSHING_KEY)
+        except ResponseError:
+            # "no such key" — просмотров не было
+            return 0
+
+    pending = client.hgetall(FLUSHING_KEY)
+    # группируем по приращению: один UPDATE на каждое уникальное значение
+    by_increment = defaultdict(list)
+    for listing_id, count in pending.items():
+        by_increment[int(count)].append(int(listing_id))
+
+    try:
+        with transaction.atomic():
+            for increment, ids in by_increment.items():
+                Listing.objects.filter(id__in=sorted(ids)).update(view_count=F('view_count') + increment)
+            client.delete(FLUSHING_KEY)
+    except Exception:
+        # транзакция откатилась, а буфер уже удалён — возвращаем просмотры
+        if not client.exists(FLUSHING_KEY):
+            pipe = client.pipeline(transaction=False)
+            for listing_id, count in pending.items():
+                pipe.hincrby(PENDING_KEY, listing_id, int(count))
+            pipe.execute()
+        raise
+    return len(pending)
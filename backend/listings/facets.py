@@ -0,0 +1,111 @@
+import hashlib
+import logging
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from redis import RedisError
+
+from .category_tree import get_category_tree
+
+logger = logging.getLogger(__name__)
+
+# Границы ценовых корзин: [0, 50), [50, 100), ..., [10000, ∞)
+PRICE_BUCKETS = (0, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LOCATION_FACET_LIMIT = 20
+FACETS_TIMEOUT = 60
+# Параметры, не влияющие на набор объявлений
+NON_FILTER_PARAMS = {'page', 'page_size', 'cursor', 'ordering', 'count', 'format'}
+
+
+def price_bucket():
+    whens = [
+        When(price__lt=upper, then=Value(i))
+        for i, upper in enumerate(PRICE_BUCKETS[1:])
+    ]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def compute_facets(queryset):
+    """
+    Все фасеты для уже отфильтрованного queryset одним запросом:
+    GROUPING SETS по категории, городу и ценовой корзине плюс общий итог.
+    """
+    inner = queryset.order_by().annotate(price_bucket=price_bucket()).values('category_id', 'location', 'price_bucket')
+    sql, params = inner.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT GROUPING(category_id), GROUPING(location), GROUPING(price_bucket),
+                   category_id, location, price_bucket, COUNT(*)
+            FROM ({sql}) AS filtered
+            GROUP BY GROUPING SETS ((category_id), (location), (price_bucket), ())
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+
+    tree = get_category_tree()
+    total = 0
+    categories, locations, buckets = [], [], {}
+    for by_category, by_location, by_price, category_id, location, bucket, count in rows:
+        if not by_category:
+            node = tree.get(category_id)
+            categories.append({
+                'id': category_id,
+                'name': node['name'] if node else '',
+                'slug': node['slug'] if node else '',
+                'count': count,
+            })
+        elif not by_location:
+            locations.append({'value': location, 'count': count})
+        elif not by_price:
+            buckets[bucket] = count
+        else:
+            total = count
+
+    categories.sort(key=lambda item: -item['count'])
+    locations.sort(key=lambda item: -item['count'])
+    price = [
+        {
+            'min': lower,
+            'max': PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+            'count': buckets.get(i, 0),
+        }
+        for i, lower in enumerate(PRICE_BUCKETS)
+    ]
+    return {
+        'count': total,
+        'category': categories,
+        'location': locations[:LOCATION_FACET_LIMIT],
+        'price': price,
+    }
+
+
+def facets_cache_key(request):
+    params = sorted(
+        (name, sorted(v for v in values if v))
+        for name, values in request.query_params.lists()
+        if name not in NON_FILTER_PARAMS and any(values)
+    )
+    return f'listings:facets:{hashlib.md5(repr(params).encode()).hexdigest()}'
+
+
+def get_facets(request, queryset):
+    """
+    Фасеты из кеша по сигнатуре фильтров (на FACETS_TIMEOUT секунд) или
+    compute_facets(queryset). queryset — ленивый, без кеша запроса нет.
+    """
+    key = facets_cache_key(request)
+    try:
+        data = cache.get(key)
+    except RedisError as e:
+        logger.warning(f"[facets] Cache unavailable: {e}")
+        return compute_facets(queryset)
+    if data is None:
+        data = compute_facets(queryset)
+        try:
+            cache.set(key, data, FACETS_TIMEOUT)
+        except RedisError as e:
+            logger.warning(f"[facets] Failed to store facets: {e}")
+    return data
@@ -0,0 +1,45 @@
+import logging
+
+from django.core.cache import cache
+from redis import RedisError
+
+from .models import Favorite
+from .response_cache import bump, current_versions
+
+logger = logging.getLogger(__name__)
+
+FAVORITE_IDS_TIMEOUT = 24 * 60 * 60
+
+
+def favorites_version(user_id):
+    return f'favorites:v:{user_id}'
+
+
+def _load(user_id):
+    return frozenset(Favorite.objects.filter(user_id=user_id).values_list('listing_id', flat=True))
+
+
+def get_favorite_ids(user):
+    """
+    id объявлений в избранном пользователя — для is_favorited на любой
+    странице без запросов. Кешируется под версией, которую поднимает
+    каждое изменение избранного (signals.py), поэтому набор,
+    прочитанный до коммита, никогда не отдаётся после него.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    try:
+        version, = current_versions([favorites_version(user.pk)])
+        key = f'favorites:ids:{user.pk}:{version}'
+        ids = cache.get(key)
+        if ids is None:
+            ids = _load(user.pk)
+            cache.set(key, ids, FAVORITE_IDS_TIMEOUT)
+        return ids
+    except RedisError as e:
+        logger.warning(f"[favorites] Cache unavailable: {e}")
+        return _load(user.pk)
+
+
+def invalidate_favorite_ids(user_id):
+    bump(favorites_version(user_id))
@@ -0,0 +1,179 @@
+import gzip
+import json
+import logging
+import tempfile
+from datetime import timedelta
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .category_tree import get_category_tree
+from .models import FeedShard, Listing, ListingImage, PendingFileDeletion
+
+logger = logging.getLogger(__name__)
+
+# Объявлений на шард: с запасом до лимита sitemap (50 000 URL)
+SHARD_SIZE = 10_000
+ITERATOR_CHUNK_SIZE = 2_000
+FEEDS_DIR = 'feeds'
+# Сколько старые файлы шарда остаются в хранилище после перегенерации
+STALE_FILE_GRACE = timedelta(days=1)
+
+
+def listing_url(slug):
+    return f"{(settings.FRONTEND_URL or '').rstrip('/')}/ad/{slug}"
+
+
+def active_listings():
+    return Listing.objects.filter(status='active')
+
+
+def shard_stats():
+    """
+    Снимок всех шардов двумя агрегатами: {shard: (count, last_modified)}.
+    Удаление меняет count; last_modified — самая поздняя отметка среди
+    объявлений, их картинок и категорий: всё это попадает в фид.
+    Удаление картинки сдвигает updated_at объявления (см. signals.py).
+    """
+    rows = (
+        active_listings()
+        .annotate(shard=F('id') / SHARD_SIZE)
+        .order_by()
+        .values('shard')
+        .annotate(
+            count=Count('id'),
+            last_modified=Max('updated_at'),
+            category_modified=Max('category__updated_at'),
+        )
+    )
+    images = (
+        ListingImage.objects.filter(listing__status='active')
+        .annotate(shard=F('listing_id') / SHARD_SIZE)
+        .order_by()
+        .values('shard')
+        .annotate(last_modified=Max('updated_at'))
+    )
+    images_modified = {row['shard']: row['last_modified'] for row in images}
+    stats = {}
+    for row in rows:
+        stamps = [row['last_modified'], row['category_modified'], images_modified.get(row['shard'])]
+        stats[row['shard']] = (row['count'], max(stamp for stamp in stamps if stamp))
+    return stats
+
+
+def shard_rows(shard):
+    primary_image = (
+        ListingImage.objects.filter(listing=OuterRef('pk'))
+        .order_by('-is_primary', 'id')
+        .values('image')[:1]
+    )
+    return (
+        active_listings()
+        .filter(id__gte=shard * SHARD_SIZE, id__lt=(shard + 1) * SHARD_SIZE)
+        .annotate(primary_image=Subquery(primary_image))
+        .order_by('id')
+        .values(
+            'id', 'slug', 'title', 'description', 'price', 'currency', 'category_id',
+            'location', 'latitude', 'longitude', 'updated_at', 'primary_image',
+        )
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+def _feed_item(row, tree):
+    category = tree.get(row['category_id'])
+    return {
+        'id': row['id'],
+        'url': listing_url(row['slug']),
+        'title': row['title'],
+        'description': row['description'],
+        'price': str(row['price']),
+        'currency': row['currency'],
+        'category': category['slug'] if category else None,
+        'location': row['location'],
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+        'image': default_storage.url(row['primary_image']) if row['primary_image'] else None,
+        'updated_at': row['updated_at'].isoformat(),
+    }
+
+
+def write_shard(shard):
+    """
+    Пишет sitemap и JSONL-фид шарда за один проход по строкам, сразу
+    в gzip. Имена уникальны на каждую генерацию: файлы в хранилище
+    неизменяемы и спокойно кешируются CDN.
+    Возвращает (имя sitemap, имя фида).
+    """
+    tree = get_category_tree()
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    with tempfile.TemporaryFile() as sitemap_file, tempfile.TemporaryFile() as feed_file:
+        with gzip.GzipFile(fileobj=sitemap_file, mode='wb') as sitemap, \
+                gzip.GzipFile(fileobj=feed_file, mode='wb') as feed:
+            sitemap.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            )
+            for row in shard_rows(shard):
+                sitemap.write(
+                    f"<url><loc>{escape(listing_url(row['slug']))}</loc>"
+                    f"<lastmod>{row['updated_at'].date().isoformat()}</lastmod></url>\n".encode()
+                )
+                feed.write(json.dumps(_feed_item(row, tree), ensure_ascii=False).encode() + b'\n')
+            sitemap.write(b'</urlset>\n')
+
+        sitemap_file.seek(0)
+        feed_file.seek(0)
+        return (
+            default_storage.save(f'{FEEDS_DIR}/sitemap-listings-{shard}-{stamp}.xml.gz', File(sitemap_file)),
+            default_storage.save(f'{FEEDS_DIR}/listings-{shard}-{stamp}.jsonl.gz', File(feed_file)),
+        )
+
+
+def generate_feeds():
+    """
+    Перегенерирует только шарды, у которых изменились count или
+    last_modified (см. shard_stats), и убирает опустевшие.
+    Старые файлы уходят в PendingFileDeletion с not_before через
+    STALE_FILE_GRACE: краулер, прочитавший прежний индекс, успеет их скачать.
+    """
+    stats = shard_stats()
+    not_before = timezone.now() + STALE_FILE_GRACE
+    existing = {shard.shard: shard for shard in FeedShard.objects.all()}
+    regenerated = 0
+
+    for number, (count, last_modified) in sorted(stats.items()):
+        current = existing.get(number)
+        if current and current.count == count and current.last_modified == last_modified:
+            continue
+        sitemap, feed = write_shard(number)
+        with transaction.atomic():
+            FeedShard.objects.update_or_create(
+                shard=number,
+                defaults={'count': count, 'last_modified': last_modified, 'sitemap': sitemap, 'feed': feed},
+            )
+            if current:
+                PendingFileDeletion.objects.bulk_create([
+                    PendingFileDeletion(name=current.sitemap, not_before=not_before),
+                    PendingFileDeletion(name=current.feed, not_before=not_before),
+                ])
+        regenerated += 1
+
+    removed = [shard for number, shard in existing.items() if number not in stats]
+    if removed:
+        with transaction.atomic():
+            PendingFileDeletion.objects.bulk_create(
+                [
+                    PendingFileDeletion(name=name, not_before=not_before)
+                    for shard in removed for name in (shard.sitemap, shard.feed)
+                ]
+            )
+            FeedShard.objects.filter(pk__in=[shard.pk for shard in removed]).delete()
+
+    logger.info(f"[feeds] {regenerated} of {len(stats)} shards regenerated, {len(removed)} removed")
+    return {'shards': len(stats), 'regenerated': regenerated, 'removed': len(removed)}
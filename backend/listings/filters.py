@@ -0,0 +1,46 @@
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+from .geo import within_radius
+from .models import Category, Listing
+
+
+class ListingFilter(filters.FilterSet):
+    price_min = filters.NumberFilter(field_name="price", lookup_expr='gte')
+    price_max = filters.NumberFilter(field_name="price", lookup_expr='lte')
+    category = filters.ModelMultipleChoiceFilter(
+        queryset=Category.objects.all(),
+        field_name='category'
+    )
+    category_slug = filters.CharFilter(field_name="category__slug", lookup_expr="iexact")
+    near = filters.CharFilter(method='filter_near', help_text='Центр поиска по радиусу: "lat,lon"')
+    radius_km = filters.NumberFilter(method='filter_radius_km', help_text='Радиус для near, км')
+
+    DEFAULT_RADIUS_KM = 10
+    MAX_RADIUS_KM = 300
+
+    def filter_near(self, queryset, name, value):
+        try:
+            lat, lon = (float(part) for part in value.split(','))
+        except ValueError:
+            raise ValidationError({'near': 'Ожидается "lat,lon"'})
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValidationError({'near': 'Координаты вне допустимого диапазона'})
+        radius = self.form.cleaned_data.get('radius_km')
+        if radius is None:
+            radius = self.DEFAULT_RADIUS_KM
+        if not 0 < radius <= self.MAX_RADIUS_KM:
+            raise ValidationError({'radius_km': f'Радиус должен быть от 0 до {self.MAX_RADIUS_KM} км'})
+        return within_radius(queryset, lat, lon, float(radius))
+
+    def filter_radius_km(self, queryset, name, value):
+        # учитывается в filter_near; без near радиус ничего не фильтрует
+        return queryset
+
+    class Meta:
+        model = Listing
+        fields = [
+            'price_min', 'price_max',
+            'category', 'category_slug',
+            'location', 'status', 'owner',
+        ]
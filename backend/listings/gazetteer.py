@@ -0,0 +1,176 @@
+import csv
+import hashlib
+import io
+import re
+import tempfile
+import unicodedata
+import zipfile
+from bisect import bisect_left
+
+import requests
+from django.db import transaction
+
+from .models import City
+from .versioned_cache import VersionedCache
+
+GEONAMES_DUMP_URL = 'https://download.geonames.org/export/dump/BE.zip'
+# admin1 коды GeoNames для Бельгии -> adminName1, как отдавал searchJSON
+ADMIN1_NAMES = {
+    'BRU': 'Brussels Capital',
+    'VLG': 'Flanders',
+    'WAL': 'Wallonia',
+}
+MAX_ALTERNATE_NAME_LENGTH = 40
+
+VERSION_KEY = 'gazetteer:version'
+# Как часто процесс сверяет свой индекс с версией в Redis (сек)
+CHECK_INTERVAL = 60
+
+_non_alnum = re.compile(r'[^0-9a-zа-яё]+')
+
+
+def normalize(text):
+    """
+    Ключ для поиска: без диакритики, в нижнем регистре, пунктуация -> пробел.
+    "Liège" -> "liege", "Sint-Niklaas" -> "sint niklaas".
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _non_alnum.sub(' ', stripped.casefold()).strip()
+
+
+class CityIndex:
+    """
+    Компактный префиксный индекс в памяти процесса: отсортированный список
+    ключей (название, альтернативные названия и каждое слово в них)
+    и бинарный поиск по нему.
+    """
+
+    def __init__(self, rows):
+        self.cities = []
+        # точное название -> позиция; при совпадении выигрывает самый крупный
+        # (строки идут по убыванию населения)
+        self.exact = {}
+        by_key = {}
+        for row in rows:
+            position = len(self.cities)
+            self.cities.append({
+                'name': row['name'],
+                'adminName1': row['admin'],
+                'lat': row['latitude'],
+                'lng': row['longitude'],
+                'population': row['population'],
+            })
+            names = [row['name']] + [n for n in row['alternate_names'].split(',') if n]
+            for name in names:
+                key = normalize(name)
+                words = key.split()
+                # "la louviere" ищется и по "la lou", и по "louv"
+                for i in range(len(words)):
+                    by_key.setdefault(' '.join(words[i:]), set()).add(position)
+                self.exact.setdefault(key, position)
+        self.keys = sorted(by_key)
+        self.positions = [sorted(by_key[key]) for key in self.keys]
+        digest = hashlib.md5()
+        for city in self.cities:
+            digest.update(f"{city['name']}|{city['adminName1']}|{city['lat']}|{city['lng']};".encode())
+        self.etag = digest.hexdigest()
+
+    def search(self, query, limit=20):
+        prefix = normalize(query)
+        if not prefix:
+            return self.cities[:limit]
+        matches = set()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            matches.update(self.positions[i])
+            i += 1
+        # позиции = порядок по убыванию населения
+        return [self.cities[p] for p in sorted(matches)[:limit]]
+
+    def lookup(self, name):
+        """Точное (без учёта регистра и диакритики) совпадение названия."""
+        position = self.exact.get(normalize(name))
+        return None if position is None else self.cities[position]
+
+
+def _build_index():
+    rows = City.objects.order_by('-population', 'name').values(
+        'name', 'admin', 'latitude', 'longitude', 'population', 'alternate_names',
+    )
+    return CityIndex(list(rows))
+
+
+_cache = VersionedCache(VERSION_KEY, _build_index, CHECK_INTERVAL, 'gazetteer')
+
+
+def get_city_index():
+    return _cache.get()
+
+
+def parse_geonames_dump(lines):
+    """
+    Разбирает строки дампа GeoNames (формат BE.txt) и оставляет
+    населённые пункты (featureClass P).
+    """
+    reader = csv.reader(lines, delimiter='\t', quoting=csv.QUOTE_NONE)
+    for row in reader:
+        if len(row) < 15 or row[6] != 'P':
+            continue
+        alternate = [
+            n for n in row[3].split(',')
+            if n and len(n) <= MAX_ALTERNATE_NAME_LENGTH and not any(ch.isdigit() for ch in n)
+        ]
+        yield City(
+            geoname_id=int(row[0]),
+            name=row[1],
+            admin=ADMIN1_NAMES.get(row[10], ''),
+            latitude=float(row[4]),
+            longitude=float(row[5]),
+            population=int(row[14] or 0),
+            alternate_names=','.join(dict.fromkeys(alternate)),
+        )
+
+
+def _open_dump(path):
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        name = next(n for n in archive.namelist() if n.endswith('.txt') and not n.startswith('readme'))
+        return io.TextIOWrapper(archive.open(name), encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def load_cities(path):
+    """
+    Загружает дамп (BE.zip или BE.txt) в City: upsert по geoname_id,
+    пропавшие из дампа удаляются. Поднимает версию индекса.
+    Возвращает число населённых пунктов.
+    """
+    with _open_dump(path) as lines:
+        cities = list(parse_geonames_dump(lines))
+    if not cities:
+        raise ValueError(f'No populated places found in {path}')
+
+    with transaction.atomic():
+        City.objects.bulk_create(
+            cities,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['geoname_id'],
+            update_fields=['name', 'admin', 'latitude', 'longitude', 'population', 'alternate_names', 'updated_at'],
+        )
+        City.objects.exclude(geoname_id__in=[c.geoname_id for c in cities]).delete()
+
+    _cache.invalidate()
+    return len(cities)
+
+
+def refresh_cities(url=GEONAMES_DUMP_URL):
+    """Скачивает свежий дамп GeoNames и загружает его (вне запросов)."""
+    with tempfile.NamedTemporaryFile(suffix='.zip') as tmp:
+        with requests.get(url, stream=True, timeout=60) as res:
+            res.raise_for_status()
+            for chunk in res.iter_content(chunk_size=64 * 1024):
+                tmp.write(chunk)
+        tmp.flush()
+        return load_cities(tmp.name)
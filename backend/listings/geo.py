@@ -0,0 +1,70 @@
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Прямоугольник (min_lat, max_lat, min_lon, max_lon), гарантированно
+    содержащий круг radius_km: по нему отсекаем кандидатов индексом.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def distance_km(lat, lon):
+    """Расстояние по формуле гаверсинусов от (lat, lon) до Listing.latitude/longitude."""
+    lat_rad = Radians(Value(lat, output_field=FloatField()))
+    dlat = Radians(F('latitude')) - lat_rad
+    dlon = Radians(F('longitude')) - Radians(Value(lon, output_field=FloatField()))
+    a = Power(Sin(dlat / 2), 2) + Cos(lat_rad) * Cos(Radians(F('latitude'))) * Power(Sin(dlon / 2), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def within_radius(queryset, lat, lon, radius_km):
+    """
+    Объявления в радиусе radius_km: сначала bounding box по индексу
+    (latitude, longitude), затем точное расстояние только для кандидатов.
+    Аннотирует distance_km.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(distance_km=distance_km(lat, lon)).filter(distance_km__lte=radius_km)
+
+
+def geocode(location):
+    """
+    Координаты для Listing.location по локальному справочнику городов
+    (точное совпадение без учёта регистра/диакритики, затем часть до
+    запятой: "Gent, Flanders" -> "Gent"). None, если город не найден.
+    """
+    from .gazetteer import get_city_index
+
+    if not location:
+        return None
+    index = get_city_index()
+    city = index.lookup(location) or index.lookup(location.split(',')[0])
+    if city is None:
+        return None
+    return city['lat'], city['lng']
+
+
+def geocode_listings(queryset):
+    """
+    Проставляет координаты объявлениям из queryset: один UPDATE на каждое
+    различающееся значение location. Возвращает число обновлённых строк.
+    """
+    updated = 0
+    locations = queryset.order_by().values_list('location', flat=True).distinct()
+    for location in list(locations):
+        latitude, longitude = geocode(location) or (None, None)
+        updated += queryset.filter(location=location).update(latitude=latitude, longitude=longitude)
+    return updated
@@ -0,0 +1,186 @@
+import ipaddress
+import os
+import socket
+import tempfile
+from urllib.parse import urlsplit, urlunsplit
+
+import pyvips
+import requests
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from requests.adapters import HTTPAdapter
+
+# Размеры для адаптивной выдачи: имя варианта -> максимальная сторона
+IMAGE_VARIANTS = {
+    'full': 1280,
+    'card': 640,
+    'thumb': 320,
+}
+IMAGE_FORMATS = {
+    'webp': lambda image, quality: image.webpsave_buffer(Q=quality, strip=True),
+    'jpeg': lambda image, quality: image.jpegsave_buffer(Q=quality, strip=True, optimize_coding=True),
+}
+
+
+# Жёсткие лимиты проверяются по заголовку, до декодирования пикселей:
+# 50 Мп — с запасом для фото с телефона, дальше почти наверняка бомба
+MAX_IMAGE_PIXELS = 50_000_000
+MAX_IMAGE_SIDE = 12_000
+# Ограничиваем кеш операций libvips, чтобы пачка загрузок не раздувала RSS воркера
+pyvips.cache_set_max_mem(64 * 1024 * 1024)
+
+
+# Загрузка картинок по URL (импорт объявлений)
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 15
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def open_source(fileobj):
+    """
+    Потоковый источник libvips поверх файлового объекта (локальный файл,
+    S3, upload): данные читаются кусками по мере декодирования.
+    """
+    fileobj.seek(0)
+    source = pyvips.SourceCustom()
+
+    def on_seek(offset, whence):
+        fileobj.seek(offset, whence)
+        return fileobj.tell()
+
+    source.on_read(fileobj.read)
+    source.on_seek(on_seek)
+    return source
+
+
+def check_image_header(fileobj):
+    """
+    Читает только заголовок и отклоняет слишком большие изображения
+    и декомпрессионные бомбы. Возвращает (width, height).
+    """
+    source = open_source(fileobj)
+    try:
+        header = pyvips.Image.new_from_source(source, "", access='sequential')
+    except pyvips.Error:
+        raise ImageRejected('Не удалось распознать изображение')
+    width, height = header.width, header.height
+    if width > MAX_IMAGE_SIDE or height > MAX_IMAGE_SIDE or width * height > MAX_IMAGE_PIXELS:
+        raise ImageRejected(f'Слишком большое изображение: {width}x{height}')
+    return width, height
+
+
+def render_variants(fileobj, quality=75):
+    """
+    Строит все варианты IMAGE_VARIANTS во всех IMAGE_FORMATS.
+    Возвращает {variant: {format: bytes}}.
+
+    Оригинал не читается в память целиком и не декодируется в полном
+    разрешении: thumbnail_source сразу декодирует до размера 'full'
+    (shrink-on-load в JPEG/WebP), меньшие размеры уменьшаются из него.
+    """
+    check_image_header(fileobj)
+    largest = max(IMAGE_VARIANTS.values())
+    # source должен жить, пока libvips лениво читает из него (до copy_memory)
+    source = open_source(fileobj)
+    image = pyvips.Image.thumbnail_source(source, largest, height=largest, size='down')
+    if image.hasalpha():
+        image = image.flatten(background=[255, 255, 255])
+    # 'full' — самый большой вариант, дальше уменьшаем уже небольшую копию
+    image = image.copy_memory()
+    del source
+    result = {}
+    for variant, max_size in IMAGE_VARIANTS.items():
+        scale = min(max_size / image.width, max_size / image.height, 1.0)
+        if scale < 1.0:
+            image = image.resize(scale).copy_memory()
+        result[variant] = {fmt: save(image, quality) for fmt, save in IMAGE_FORMATS.items()}
+    return result
+
+
+def store_variants(listing_image, rendered):
+    """
+    Сохраняет варианты в хранилище (локальное или S3) рядом с оригиналом.
+    Возвращает {variant: {format: storage name}} для ListingImage.variants.
+    """
+    base = f"listings/variants/{listing_image.listing_id}/{listing_image.pk}"
+    stored = {}
+    for variant, formats in rendered.items():
+        stored[variant] = {}
+        for fmt, data in formats.items():
+            ext = 'jpg' if fmt == 'jpeg' else fmt
+            name = default_storage.save(os.path.join(base, f"{variant}.{ext}"), ContentFile(data))
+            stored[variant][fmt] = name
+    return stored
+
+
+def _resolve_public_host(host):
+    """
+    Адрес хоста, если все его адреса публичные: не ходим во внутреннюю
+    сеть по ссылкам из пользовательских данных.
+    """
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, None)]
+    except socket.gaierror:
+        raise ImageRejected(f'Не удалось найти хост {host}')
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ImageRejected(f'Адрес {host} недоступен для загрузки')
+    return addresses[0]
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """
+    Соединение с уже проверенным IP: повторного DNS-запроса нет, поэтому
+    DNS rebinding не подменит адрес после проверки. SNI и проверка
+    сертификата идут по исходному имени хоста.
+    """
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['server_hostname'] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def download_image(url):
+    """
+    Скачивает картинку по http(s) во временный файл (не больше
+    MAX_DOWNLOAD_BYTES, без редиректов) и проверяет заголовок.
+    Возвращает открытый временный файл, закрыть — на вызывающем.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ImageRejected(f'Неподдерживаемый URL: {url}')
+    address = _resolve_public_host(parts.hostname)
+    # запрос идёт на проверенный IP, исходное имя — в Host
+    host = f'[{address}]' if ':' in address else address
+    port = f':{parts.port}' if parts.port else ''
+    pinned_url = urlunsplit(parts._replace(netloc=f'{host}{port}'))
+    host_header = f'[{parts.hostname}]' if ':' in parts.hostname else parts.hostname
+
+    tmp = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        with requests.Session() as session:
+            session.mount(f'{parts.scheme}://', PinnedHostAdapter(parts.hostname))
+            with session.get(
+                pinned_url, headers={'Host': f'{host_header}{port}'},
+                stream=True, timeout=DOWNLOAD_TIMEOUT, allow_redirects=False,
+            ) as res:
+                res.raise_for_status()
+                size = 0
+                for chunk in res.iter_content(chunk_size=64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_DOWNLOAD_BYTES:
+                        raise ImageRejected(f'Файл больше {MAX_DOWNLOAD_BYTES} байт: {url}')
+                    tmp.write(chunk)
+        check_image_header(tmp)
+        tmp.seek(0)
+        return tmp
+    except BaseException:
+        tmp.close()
+        raise
@@ -0,0 +1,72 @@
+import io
+import multiprocessing
+import resource
+import time
+
+import pyvips
+from django.core.management.base import BaseCommand
+
+from listings.images import IMAGE_FORMATS, IMAGE_VARIANTS, render_variants
+
+
+def legacy_render(fileobj, quality=75):
+    # прежний путь: весь файл в память, декодирование в полном разрешении, потом resize
+    image = pyvips.Image.new_from_buffer(fileobj.read(), "")
+    result = {}
+    for variant, max_size in IMAGE_VARIANTS.items():
+        scale = min(max_size / image.width, max_size / image.height, 1.0)
+        resized = image.resize(scale) if scale < 1.0 else image
+        result[variant] = {fmt: save(resized, quality) for fmt, save in IMAGE_FORMATS.items()}
+    return result
+
+
+MODES = {
+    'legacy': legacy_render,
+    'shrink-on-load': render_variants,
+}
+
+
+def _run(mode, payload, iterations, queue):
+    pyvips.cache_set_max(0)
+    render = MODES[mode]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render(io.BytesIO(payload))
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, rss_after - rss_before))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает память и скорость прежнего и shrink-on-load декодирования картинок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Путь к изображению (по умолчанию — синтетическое 4032x3024 JPEG)')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], 'rb') as f:
+                payload = f.read()
+        else:
+            # размер типичного фото с телефона, с шумом, чтобы JPEG не был вырожденным
+            noise = pyvips.Image.gaussnoise(4032, 3024, mean=128, sigma=40)
+            payload = noise.bandjoin([noise, noise]).cast('uchar').jpegsave_buffer(Q=85)
+
+        iterations = options['iterations']
+        self.stdout.write(f'Input: {len(payload) / 1024:.0f} KiB, {iterations} iterations per mode')
+        # spawn, а не fork: libvips уже запустил свои потоки в этом процессе
+        ctx = multiprocessing.get_context('spawn')
+        for mode in MODES:
+            # отдельный процесс на режим, чтобы пиковый RSS не смешивался
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(mode, payload, iterations, queue))
+            proc.start()
+            elapsed, rss_delta_kb = queue.get()
+            proc.join()
+            self.stdout.write(
+                f'{mode:>15}: {iterations / elapsed:6.2f} img/s, '
+                f'{elapsed / iterations * 1000:7.1f} ms/img, '
+                f'peak RSS +{rss_delta_kb / 1024:.1f} MiB'
+            )
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from listings.geo import distance_km, within_radius
+from listings.models import Listing
+from listings.seeding import LAT_RANGE, LON_RANGE, seed_listings
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по радиусу (bounding box по индексу + точное расстояние) '
+        'с полным перебором на синтетических объявлениях. Всё откатывается в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--radius', type=float, default=10.0)
+        parser.add_argument('--queries', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmark requires PostgreSQL')
+
+        with transaction.atomic():
+            self.seed(options['rows'])
+            rng = random.Random(42)
+            centers = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(options['queries'])]
+            radius = options['radius']
+
+            def bounded(lat, lon):
+                return within_radius(Listing.objects.all(), lat, lon, radius)
+
+            def full_scan(lat, lon):
+                # прежний вариант без отсечения: расстояние считается для каждой строки
+                return Listing.objects.annotate(distance_km=distance_km(lat, lon)).filter(distance_km__lte=radius)
+
+            for name, build in (('full scan', full_scan), ('bounding box', bounded)):
+                self.measure(name, build, centers)
+
+            lat, lon = centers[0]
+            plan = bounded(lat, lon).order_by('-created_at')[:20].explain()
+            self.stdout.write('\nPlan (bounding box, first page):\n' + plan)
+
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        started = time.perf_counter()
+        seed_listings(rows)
+        self.stdout.write(f'Seeded {rows} listings in {time.perf_counter() - started:.1f} s')
+
+    def measure(self, name, build, centers):
+        count_time = page_time = 0.0
+        total = 0
+        for lat, lon in centers:
+            started = time.perf_counter()
+            total += build(lat, lon).count()
+            count_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            list(build(lat, lon).order_by('-created_at').values_list('id', flat=True)[:20])
+            page_time += time.perf_counter() - started
+        n = len(centers)
+        self.stdout.write(
+            f'{name:>13}: count {count_time / n * 1000:8.1f} ms, '
+            f'first page {page_time / n * 1000:8.1f} ms, '
+            f'avg {total / n:.0f} matches'
+        )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Listing, ListingImage, ListingVideo
+from listings.seeding import seed_listings
+from listings.views import ListingViewSet
+
+# Экшены ленты и query-параметры; {category} подставляется из засеянных данных
+LIST_SHAPES = [
+    ('feed', 'list', {}),
+    ('category', 'list', {'category': '{category}'}),
+    ('order by price', 'list', {'ordering': 'price'}),
+    ('my listings', 'my_listings', {}),
+    ('favorites', 'favorites', {}),
+]
+PAGE_SIZES = (2, 50)
+# Столько картинок и видео добавляется второму объявлению для проверки карточки
+EXTRA_MEDIA = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает SQL-запросы list, retrieve, my_listings и favorites при разных '
+        'размерах страницы (и числе картинок у объявления) и падает, если число '
+        'запросов от них зависит (N+1). Засевает синтетические данные и откатывает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000, help='Сколько объявлений засеять')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query count checks require PostgreSQL')
+
+        # без кеша ответов: иначе запросы второго прогона не дойдут до БД
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ), transaction.atomic():
+            user, _ = seed_listings(options['rows'], categories=5, images=True, favorites=options['rows'] // 2)
+            failures = self.check_lists(user) + self.check_retrieve(user)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('Query count depends on result size:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Query counts do not depend on result size'))
+
+    def count_queries(self, user, action, path, params=None, **kwargs):
+        request = APIRequestFactory().get(path, params or {})
+        force_authenticate(request, user=user)
+        view = ListingViewSet.as_view({'get': action})
+        with CaptureQueriesContext(connection) as captured:
+            response = view(request, **kwargs)
+        if response.status_code != 200:
+            raise CommandError(f'{action} {path}: HTTP {response.status_code}')
+        return len(captured.captured_queries)
+
+    def report(self, name, counts):
+        failed = len(set(counts)) > 1
+        result = self.style.ERROR('FAIL') if failed else 'ok'
+        self.stdout.write(f'{name:>16}: {" / ".join(map(str, counts))} queries, {result}')
+        return [f'{name}: {counts} queries'] if failed else []
+
+    def check_lists(self, user):
+        category = str(Listing.objects.filter(owner=user).values_list('category_id', flat=True).first())
+        failures = []
+        for name, action, params in LIST_SHAPES:
+            params = {key: value.format(category=category) for key, value in params.items()}
+            counts = [
+                self.count_queries(user, action, '/api/listings/', {**params, 'page_size': str(size)})
+                for size in PAGE_SIZES
+            ]
+            failures += self.report(name, counts)
+        return failures
+
+    def check_retrieve(self, user):
+        plain, rich = Listing.objects.filter(owner=user).order_by('-id')[:2]
+        # bulk_create: без сигналов, версии кеша и updated_at не трогаем
+        ListingImage.objects.bulk_create(
+            ListingImage(listing=rich, image='listings/seed.jpg', status='ready') for _ in range(EXTRA_MEDIA)
+        )
+        ListingVideo.objects.bulk_create(
+            ListingVideo(listing=rich, video='listings/videos/seed.mp4') for _ in range(EXTRA_MEDIA)
+        )
+        counts = [
+            self.count_queries(user, 'retrieve', f'/api/listings/{listing.slug}/', slug=listing.slug)
+            for listing in (plain, rich)
+        ]
+        return self.report('retrieve', counts)
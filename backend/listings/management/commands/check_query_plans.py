@@ -0,0 +1,131 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from listings.models import Listing
+from listings.seeding import seed_listings
+from listings.views import ListingViewSet
+
+# Формы запросов API: (название, экшен, query-параметры). {category},
+# {category_slug}, {owner} подставляются из засеянных данных.
+QUERY_SHAPES = [
+    ('feed', 'list', {}),
+    # так ленту запрашивает фронтенд: page=1 должен идти по keyset, без COUNT(*)
+    ('feed, page=1', 'list', {'page': '1', 'page_size': '12'}),
+    ('category', 'list', {'category': '{category}'}),
+    ('category_slug', 'list', {'category_slug': '{category_slug}'}),
+    ('location', 'list', {'location': 'Gent'}),
+    ('owner', 'list', {'owner': '{owner}'}),
+    ('price range', 'list', {'price_min': '100', 'price_max': '500'}),
+    ('order by price', 'list', {'ordering': 'price'}),
+    ('order by -price', 'list', {'ordering': '-price'}),
+    ('order by -view_count', 'list', {'ordering': '-view_count'}),
+    ('moderation queue', 'list', {'status': 'pending'}),
+    ('full-text search', 'list', {'q': 'listing'}),
+    ('radius', 'list', {'near': '50.85,4.35', 'radius_km': '10'}),
+    ('detail', 'retrieve', {}),
+    ('my listings', 'my_listings', {}),
+    ('favorites', 'favorites', {}),
+    ('facets, category', 'facets', {'category_slug': '{category_slug}'}),
+]
+
+
+def seq_scans(plan):
+    """Таблицы всех узлов Seq Scan плана (рекурсивно)."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет формы запросов API объявлений через настоящие view, делает EXPLAIN '
+        'каждого SELECT и падает, если большая таблица читается Seq Scan. '
+        'По умолчанию засевает синтетические данные и откатывает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000, help='Сколько объявлений засеять')
+        parser.add_argument('--no-seed', action='store_true', help='Проверять на текущих данных')
+        parser.add_argument(
+            '--min-rows', type=int, default=10_000,
+            help='Seq Scan по таблице от стольких строк считается регрессией',
+        )
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plan checks require PostgreSQL')
+
+        # без кеша ответов/фасетов: иначе часть запросов не дойдёт до БД
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ), transaction.atomic():
+            if options['no_seed']:
+                latest = Listing.objects.order_by('-created_at').first()
+                if latest is None:
+                    raise CommandError('No listings to check, run without --no-seed')
+                user = latest.owner
+            else:
+                user, _ = seed_listings(
+                    options['rows'], categories=50, images=True, favorites=options['rows'] // 10,
+                )
+            failures = self.check_shapes(user, options)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('Sequential scans on large tables:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('No sequential scans on large tables'))
+
+    def table_sizes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+            return dict(cursor.fetchall())
+
+    def check_shapes(self, user, options):
+        sizes = self.table_sizes()
+        listing = Listing.objects.filter(owner=user).select_related('category').order_by('-created_at').first()
+        values = {
+            'category': str(listing.category_id),
+            'category_slug': listing.category.slug,
+            'owner': str(user.pk),
+        }
+        factory = APIRequestFactory()
+        failures = []
+        for name, action, params in QUERY_SHAPES:
+            params = {key: value.format(**values) for key, value in params.items()}
+            path = f'/api/listings/{listing.slug}/' if action == 'retrieve' else '/api/listings/'
+            request = factory.get(path, params)
+            # авторизованный запрос: кеш ответов не участвует, is_favorited считается
+            force_authenticate(request, user=user)
+            view = ListingViewSet.as_view({'get': action})
+            kwargs = {'slug': listing.slug} if action == 'retrieve' else {}
+            with CaptureQueriesContext(connection) as captured:
+                response = view(request, **kwargs)
+            if response.status_code != 200:
+                failures.append(f'{name}: HTTP {response.status_code}')
+                continue
+
+            failed = len(failures)
+            selects = [q['sql'] for q in captured.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+            for sql in selects:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                    plan = cursor.fetchone()[0]
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+                for table in seq_scans(plan):
+                    if sizes.get(table, 0) < options['min_rows']:
+                        continue
+                    failures.append(f'{name}: Seq Scan on {table} (~{int(sizes[table])} rows)\n    {sql[:300]}')
+                if options['verbose_plans']:
+                    self.stdout.write(f'{name}: cost {plan["Total Cost"]}\n    {sql[:300]}')
+            result = self.style.ERROR('FAIL') if len(failures) > failed else 'ok'
+            self.stdout.write(f'{name:>22}: {len(selects)} queries, {result}')
+        return failures
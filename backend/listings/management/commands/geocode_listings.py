@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from listings.geo import geocode_listings
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Проставляет координаты объявлениям по справочнику городов (после загрузки refresh_cities)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Пересчитать и уже геокодированные объявления')
+
+    def handle(self, *args, **options):
+        queryset = Listing.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(latitude__isnull=True)
+        count = geocode_listings(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {count} listings'))
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.bulk_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, ListingImporter
+
+
+class Command(BaseCommand):
+    help = 'Импортирует объявления продавца из CSV или JSONL (потоково, пачками)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help='Email владельца объявлений')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(email=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['owner']} not found")
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f'Unknown format {fmt}, use --format')
+
+        started = time.perf_counter()
+        with open(options['path'], 'rb') as f:
+            report = ListingImporter(owner, batch_size=options['batch_size']).run(f, fmt)
+        elapsed = time.perf_counter() - started
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        rows = report['created'] + report['failed']
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, failed {report['failed']} "
+            f"in {elapsed:.1f} s ({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from listings.gazetteer import GEONAMES_DUMP_URL, load_cities, refresh_cities
+
+
+class Command(BaseCommand):
+    help = 'Загружает справочник бельгийских городов из дампа GeoNames (BE.zip / BE.txt)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Локальный дамп вместо скачивания')
+        parser.add_argument('--url', default=GEONAMES_DUMP_URL)
+
+    def handle(self, *args, **options):
+        if options['file']:
+            count = load_cities(options['file'])
+        else:
+            count = refresh_cities(options['url'])
+        self.stdout.write(self.style.SUCCESS(f'Loaded {count} populated places'))
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def _weighted(column, weight):
+    return ' || '.join(
+        f"setweight(to_tsvector('pg_catalog.{config}', coalesce(NEW.{column}, '')), '{weight}')"
+        for config in ('russian', 'french', 'dutch')
+    )
+
+
+# search_vector поддерживается триггером, чтобы bulk_create/update()
+# и правки из админки тоже попадали в индекс.
+CREATE_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION listings_listing_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        {_weighted('title', 'A')} ||
+        {_weighted('description', 'B')} ||
+        {_weighted('location', 'C')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER listings_listing_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, location
+    ON listings_listing
+    FOR EACH ROW EXECUTE FUNCTION listings_listing_search_vector_update();
+
+-- заполняем вектор для существующих объявлений
+UPDATE listings_listing SET title = title;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS listings_listing_search_vector_trigger ON listings_listing;
+DROP FUNCTION IF EXISTS listings_listing_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='listing_search_vector_gin'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # уже загруженные картинки обработаны (или сохранены как есть) синхронно
+    ListingImage = apps.get_model('listings', 'ListingImage')
+    ListingImage.objects.update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_listing_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
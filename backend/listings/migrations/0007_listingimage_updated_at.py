@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    ListingImage = apps.get_model('listings', 'ListingImage')
+    ListingImage.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_listing_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
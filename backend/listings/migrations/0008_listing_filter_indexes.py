@@ -0,0 +1,58 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:36
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не блокирует запись в большие таблицы,
+    # но не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('listings', '0007_listingimage_updated_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(django.db.models.functions.text.Upper('slug'), name='category_slug_upper_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['-created_at', '-id'], name='listing_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['price', 'id'], name='listing_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['view_count', 'id'], name='listing_view_count_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='listing_category_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['location', '-created_at', '-id'], name='listing_location_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='listing_owner_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at', '-id'], name='listing_pending_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='listingimage',
+            index=models.Index(fields=['listing', 'is_primary'], name='listingimage_primary_idx'),
+        ),
+    ]
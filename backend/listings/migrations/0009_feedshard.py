@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveIntegerField(unique=True)),
+                ('count', models.PositiveIntegerField()),
+                ('last_modified', models.DateTimeField()),
+                ('sitemap', models.CharField(max_length=255)),
+                ('feed', models.CharField(max_length=255)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'feed shard',
+                'verbose_name_plural': 'feed shards',
+                'ordering': ['shard'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('listings', '0009_feedshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('params', models.JSONField(default=dict)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='listings.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'saved search',
+                'verbose_name_plural': 'saved searches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['category', 'price_min', 'price_max'], name='savedsearch_candidate_idx'), models.Index(fields=['user', '-created_at'], name='savedsearch_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_savedsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='pendingfiledeletion',
+            name='not_before',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
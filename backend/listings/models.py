@@ -1,4 +1,10 @@
-from django.db import models
+import re
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Substr, Upper
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from slugify import slugify
@@ -8,14 +14,42 @@ class Category(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     icon = models.CharField(max_length=50, blank=True)
     slug = models.SlugField(unique=True)
+    # для актуальности фидов: переименование категории меняет их содержимое
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _('category')
         verbose_name_plural = _('categories')
+        indexes = [
+            # фильтр category_slug — iexact, т.е. UPPER(slug) = UPPER(%s)
+            models.Index(Upper('slug'), name='category_slug_upper_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
+class ListingQuerySet(models.QuerySet):
+    def for_api(self):
+        """
+        Всё, что нужно ListingSerializer, фиксированным числом запросов:
+        owner через JOIN, картинки/видео — prefetch. category_detail берётся
+        из закешированного дерева категорий, is_favorited — из закешированного
+        набора избранного (listings/favorites.py).
+        """
+        return (
+            self.defer('search_vector')
+            .select_related('owner')
+            .prefetch_related('images', 'videos')
+        )
+
+    def with_is_favorited(self, user=None):
+        if user is None or not user.is_authenticated:
+            return self
+        return self.annotate(is_favorited=models.Exists(
+            Favorite.objects.filter(user=user, listing=models.OuterRef('pk'))
+        ))
+
+
 class Listing(models.Model):
     STATUS_CHOICES = [
         ('active', _('Active')),
@@ -31,41 +65,160 @@ class Listing(models.Model):
     currency = models.CharField(max_length=3, default='RUB')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='listings')
     location = models.CharField(max_length=255)
+    # Проставляются из location по справочнику городов при сохранении (listings/geo.py)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='listings')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     is_featured = models.BooleanField(default=False)
     view_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Заполняется триггером в БД (title/description/location), см. listings/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ListingQuerySet.as_manager()
     
     class Meta:
         verbose_name = _('listing')
         verbose_name_plural = _('listings')
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='listing_search_vector_gin'),
+            # bounding box для поиска по радиусу
+            models.Index(fields=['latitude', 'longitude'], name='listing_lat_lon_idx'),
+            # Ленты: сортировка + id как в ListingCursorPagination, фильтры ListingFilter
+            # первым полем, чтобы первая страница читалась по индексу без сортировки
+            models.Index(fields=['-created_at', '-id'], name='listing_created_idx'),
+            models.Index(fields=['price', 'id'], name='listing_price_idx'),
+            models.Index(fields=['view_count', 'id'], name='listing_view_count_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='listing_category_created_idx'),
+            models.Index(fields=['location', '-created_at', '-id'], name='listing_location_created_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='listing_owner_created_idx'),
+            # очередь модерации маленькая — частичный индекс не раздувается
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='pending'),
+                name='listing_pending_created_idx',
+            ),
+        ]
     
+    # длина SlugField — 50, оставляем место под суффикс "-N"
+    SLUG_BASE_MAX_LENGTH = 40
+    SLUG_ALLOCATION_ATTEMPTS = 5
+
+    @classmethod
+    def base_slug(cls, title):
+        return slugify(title, max_length=cls.SLUG_BASE_MAX_LENGTH, word_boundary=True) or 'listing'
+
+    @classmethod
+    def next_free_slug(cls, base_slug):
+        """
+        Следующий свободный slug одним запросом: максимальный числовой
+        суффикс среди base и base-N (префиксный поиск по индексу slug),
+        вместо перебора base-1, base-2, ... по одному exists() на каждый.
+        Число из заголовка неотличимо от суффикса: если есть iphone-13
+        (заголовок «iPhone 13»), для базы iphone выдаётся iphone-14, а не
+        iphone-1. Slug всё равно уникален, нумерация лишь перескакивает.
+        """
+        suffix = models.Case(
+            models.When(slug=base_slug, then=models.Value(0)),
+            default=Cast(Substr('slug', len(base_slug) + 2), models.BigIntegerField()),
+            output_field=models.BigIntegerField(),
+        )
+        last = cls.objects.filter(
+            models.Q(slug=base_slug)
+            | models.Q(slug__startswith=f'{base_slug}-', slug__regex=rf'^{re.escape(base_slug)}-[0-9]{{1,9}}$')
+        ).aggregate(last=models.Max(suffix))['last']
+        if last is None:
+            return base_slug
+        return f'{base_slug}-{last + 1}'
+
+    @classmethod
+    def allocate_slugs(cls, titles):
+        """
+        Slug для каждого заголовка пачки одним запросом: максимальный
+        суффикс по каждой базе — отдельный агрегат (как в next_free_slug),
+        дальше номера раздаются в памяти, в т.ч. одинаковым заголовкам.
+        """
+        bases = [cls.base_slug(title) for title in titles]
+        unique = list(dict.fromkeys(bases))
+        condition = models.Q()
+        aggregates = {}
+        for i, base in enumerate(unique):
+            matches = models.Q(slug=base) | models.Q(
+                slug__startswith=f'{base}-', slug__regex=rf'^{re.escape(base)}-[0-9]{{1,9}}$'
+            )
+            condition |= matches
+            aggregates[f'b{i}'] = models.Max(models.Case(
+                models.When(slug=base, then=models.Value(0)),
+                models.When(matches, then=Cast(Substr('slug', len(base) + 2), models.BigIntegerField())),
+                output_field=models.BigIntegerField(),
+            ))
+        last = cls.objects.filter(condition).aggregate(**aggregates)
+        next_suffix = {base: last[f'b{i}'] for i, base in enumerate(unique)}
+
+        slugs = []
+        for base in bases:
+            suffix = next_suffix[base]
+            slugs.append(base if suffix is None else f'{base}-{suffix + 1}')
+            next_suffix[base] = 0 if suffix is None else suffix + 1
+        return slugs
+
+    def geocode(self):
+        from .geo import geocode
+
+        self.latitude, self.longitude = geocode(self.location) or (None, None)
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            unique_slug = base_slug
-            counter = 1
-            while Listing.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = unique_slug
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'location' in update_fields:
+            self.geocode()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        base_slug = self.base_slug(self.title)
+        for attempt in range(self.SLUG_ALLOCATION_ATTEMPTS):
+            self.slug = self.next_free_slug(base_slug)
+            try:
+                # savepoint: при гонке двух create откатываем только эту вставку
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError as e:
+                if 'slug' not in str(e) or attempt == self.SLUG_ALLOCATION_ATTEMPTS - 1:
+                    self.slug = ''
+                    raise
     
     def __str__(self):
         return self.title
 
 class ListingImage(models.Model):
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('processing', _('Processing')),
+        ('ready', _('Ready')),
+        ('failed', _('Failed')),
+    ]
+
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='listings/')
     is_primary = models.BooleanField(default=False)
+    # Варианты строит listings.tasks.process_listing_image: {variant: {format: storage name}}
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # для ETag карточки: меняется и при обработке вариантов
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _('listing image')
         verbose_name_plural = _('listing images')
+        indexes = [
+            models.Index(fields=['listing', 'is_primary'], name='listingimage_primary_idx'),
+        ]
     
     def __str__(self):
         return f"Image for {self.listing.title}"
@@ -91,6 +244,122 @@ class Favorite(models.Model):
         verbose_name = _('favorite')
         verbose_name_plural = _('favorites')
         unique_together = ('user', 'listing')
+        indexes = [
+            # избранное пользователя по времени добавления (пагинация favorites)
+            models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}'s favorite: {self.listing.title}"
+
+class PendingFileDeletion(models.Model):
+    """
+    Файлы удалённых объявлений, которые ещё нужно стереть из хранилища.
+    Пишется в одной транзакции с удалением строк, поэтому очистка
+    переживает падение воркера (см. listings/retention.py).
+    Файл стирается не раньше not_before: старые шарды фидов ещё
+    какое-то время отдаются краулерам (см. listings/feeds.py).
+    """
+    name = models.CharField(max_length=255)
+    not_before = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('pending file deletion')
+        verbose_name_plural = _('pending file deletions')
+
+    def __str__(self):
+        return self.name
+
+class City(models.Model):
+    """
+    Населённые пункты Бельгии из дампа GeoNames (featureClass P).
+    Обновляется задачей refresh_belgian_cities, на запросах в GeoNames не ходим.
+    """
+    geoname_id = models.PositiveIntegerField(unique=True)
+    name = models.CharField(max_length=200)
+    admin = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    population = models.PositiveIntegerField(default=0)
+    # через запятую: Bruxelles,Brussel,Брюссель,...
+    alternate_names = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('city')
+        verbose_name_plural = _('cities')
+        ordering = ['-population', 'name']
+
+    def __str__(self):
+        return self.name
+
+class FeedShard(models.Model):
+    """
+    Шард sitemap и партнёрского фида: активные объявления с id в
+    [shard * SHARD_SIZE, (shard + 1) * SHARD_SIZE). count и last_modified —
+    снимок на момент генерации, по ним задача понимает, что шард устарел
+    (см. listings/feeds.py).
+    """
+    shard = models.PositiveIntegerField(unique=True)
+    count = models.PositiveIntegerField()
+    last_modified = models.DateTimeField()
+    sitemap = models.CharField(max_length=255)
+    feed = models.CharField(max_length=255)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('feed shard')
+        verbose_name_plural = _('feed shards')
+        ordering = ['shard']
+
+    def __str__(self):
+        return f'Feed shard {self.shard}'
+
+class SavedSearch(models.Model):
+    """
+    Сохранённый поиск пользователя: параметры ListingFilter/?q= как в
+    запросе к ленте. category, price_min, price_max — копия параметров
+    для отбора кандидатов по индексу при сопоставлении новых объявлений
+    (listings/saved_searches.py); null — поиск не ограничен этим полем.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    params = models.JSONField(default=dict)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, editable=False)
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('saved search')
+        verbose_name_plural = _('saved searches')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['category', 'price_min', 'price_max'], name='savedsearch_candidate_idx'),
+            models.Index(fields=['user', '-created_at'], name='savedsearch_user_created_idx'),
+        ]
+
+    def index_params(self):
+        from .category_tree import get_category_tree
+
+        params = self.params
+        categories = params.get('category') or []
+        self.category_id = None
+        if len(categories) == 1:
+            self.category_id = int(categories[0])
+        elif not categories and params.get('category_slug'):
+            slug = params['category_slug'].lower()
+            tree = get_category_tree()
+            self.category_id = next(
+                (node['id'] for node in tree.nodes.values() if node['slug'].lower() == slug), None
+            )
+        self.price_min = params.get('price_min')
+        self.price_max = params.get('price_max')
+
+    def save(self, *args, **kwargs):
+        self.index_params()
+        return super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name or f'Saved search {self.pk}'
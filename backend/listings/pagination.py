@@ -0,0 +1,203 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import DatabaseError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# До этого порога оценка планировщика заменяется точным COUNT(*) — он дешёвый
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк по плану запроса (EXPLAIN) без COUNT(*).
+    Маленькие выборки досчитываются точно.
+    """
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, ValueError, KeyError, IndexError, TypeError):
+        return queryset.count()
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class ListingCursorPagination(BasePagination):
+    """
+    Keyset-пагинация для лент объявлений: позиция кодируется парой
+    (значение поля сортировки, id), поэтому страница строится одним
+    индексным запросом без OFFSET, на любой глубине.
+
+    Сортировка берётся из queryset (OrderingFilter / поиск / сам view),
+    id добавляется как стабильный tie-breaker в том же направлении.
+    count по умолчанию — оценка планировщика, ?count=exact — точный.
+    Запросы с ?page=N при N > 1 обслуживаются прежней
+    PageNumberPagination; ?page=1 — первая страница keyset.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_ordering = '-created_at'
+    legacy_pagination_class = PageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = None
+        # клиенты с номерами страниц всегда шлют page=1: первую отдаём keyset'ом
+        page = request.query_params.get(self.legacy_pagination_class.page_query_param)
+        if page not in (None, '', '1'):
+            self.legacy = self.legacy_pagination_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        field, descending = self._split(self.ordering)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.get('r'))
+        if cursor and cursor.get('o') != self.ordering:
+            raise NotFound('Invalid cursor')
+
+        forward_desc = descending != reverse
+        qs = queryset.order_by(*self._order_by(field, forward_desc))
+        if cursor:
+            value = self._parse_value(queryset, field, cursor.get('v'))
+            qs = qs.filter(self._keyset_q(field, forward_desc, value, cursor.get('i')))
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        self.count = self.get_count(queryset, request)
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return PageNumberPagination().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор следующей/предыдущей страницы',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'exact — точный count вместо оценки',
+                'schema': {'type': 'string', 'enum': ['exact']},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_count(self, queryset, request):
+        if request.query_params.get(self.count_query_param) == 'exact':
+            return queryset.count()
+        return estimate_count(queryset)
+
+    def get_ordering(self, queryset):
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        first = order_by[0] if order_by else self.default_ordering
+        if not isinstance(first, str) or first.lstrip('-') in ('id', 'pk', '?'):
+            return self.default_ordering
+        return first
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        field, _ = self._split(self.ordering)
+        value = getattr(obj, field)
+        payload = {
+            'o': self.ordering,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'i': obj.pk,
+        }
+        if reverse:
+            payload['r'] = 1
+        token = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode()).decode())
+            int(payload['i'])
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+        return payload
+
+    @staticmethod
+    def _split(ordering):
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    @staticmethod
+    def _order_by(field, descending):
+        prefix = '-' if descending else ''
+        return f'{prefix}{field}', f'{prefix}id'
+
+    @staticmethod
+    def _keyset_q(field, descending, value, pk):
+        op = 'lt' if descending else 'gt'
+        # Лишнее условие field <= / >= value даёт планировщику диапазон по индексу
+        bound = 'lte' if descending else 'gte'
+        return Q(**{f'{field}__{bound}': value}) & (
+            Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+        )
+
+    @staticmethod
+    def _parse_value(queryset, field, raw):
+        annotation = queryset.query.annotations.get(field)
+        try:
+            if annotation is not None:
+                return annotation.output_field.to_python(raw)
+            return queryset.model._meta.get_field(field).to_python(raw)
+        except (FieldDoesNotExist, ValidationError, TypeError):
+            raise NotFound('Invalid cursor')
@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from redis import RedisError
+from rest_framework import status
+from rest_framework.response import Response
+
+from .category_tree import get_category_tree
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+# Ответы для анонимов: записи не протухают по времени — их делают
+# недостижимыми счётчики версий, TTL только ограничивает память
+RESPONSE_TIMEOUT = 300
+# Холодный ключ считает один запрос, остальные ждут его результат
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+# Любое изменение объявления (в т.ч. картинок/видео) — для лент без фильтра по категории
+ALL_LISTINGS = 'listings:v'
+
+
+def listing_version(slug):
+    return f'listings:v:listing:{slug}'
+
+
+def category_version(category_id):
+    return f'listings:v:category:{category_id}'
+
+
+def is_cacheable(request):
+    return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+
+def current_versions(names):
+    """
+    Текущие значения счётчиков. Отсутствующий (новый или вытесненный из
+    Redis) счётчик начинается со времени, а не с нуля, чтобы не совпасть
+    со старыми ключами ответов.
+    """
+    found = cache.get_many(names)
+    for name in names:
+        if name not in found:
+            value = time.time_ns()
+            if not cache.add(name, value, timeout=None):
+                value = cache.get(name, value)
+            found[name] = value
+    return [found[name] for name in names]
+
+
+def bump(*names):
+    """Поднимает счётчики версий: закешированные по ним ответы больше не отдаются."""
+    try:
+        for name in names:
+            try:
+                cache.incr(name)
+            except ValueError:
+                cache.add(name, time.time_ns(), timeout=None)
+    except RedisError as e:
+        logger.warning(f"[response-cache] Failed to bump {names}: {e}")
+
+
+def bump_listing(listing_id):
+    """Версии объявления по id (для изменений картинок/видео и .update() в обход сигналов)."""
+    row = Listing.objects.filter(pk=listing_id).values_list('slug', 'category_id').first()
+    if row is None:
+        # объявление удалено вместе с медиа: версии подняло его собственное удаление
+        return
+    slug, category_id = row
+    bump(ALL_LISTINGS, listing_version(slug), category_version(category_id))
+
+
+def _category_ids(request):
+    """
+    Категории из фильтров category / category_slug. Выдача с таким
+    фильтром зависит только от объявлений этих категорий.
+    """
+    ids = set()
+    for value in request.query_params.getlist('category'):
+        if not value.isdigit():
+            return None
+        ids.add(int(value))
+    slug = request.query_params.get('category_slug')
+    if slug:
+        tree = get_category_tree()
+        matches = [node['id'] for node in tree.nodes.values() if node['slug'].lower() == slug.lower()]
+        if not matches:
+            return None
+        ids.update(matches)
+    return sorted(ids) or None
+
+
+def _key(request, kind, versions):
+    # параметры нормализуются: порядок не важен, пустые значения не влияют на фильтры
+    params = sorted(
+        (name, sorted(v for v in values if v))
+        for name, values in request.query_params.lists()
+        if any(values)
+    )
+    # дерево категорий встроено в каждое объявление (category_detail)
+    raw = f'{request.get_host()}|{request.path}|{params}|{versions}|{get_category_tree().etag}'
+    return f'listings:response:{kind}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def list_key(request):
+    category_ids = _category_ids(request)
+    names = [category_version(pk) for pk in category_ids] if category_ids else [ALL_LISTINGS]
+    return _key(request, 'list', current_versions(names))
+
+
+def detail_key(request, slug):
+    return _key(request, 'detail', current_versions([listing_version(slug)]))
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return None
+
+
+def _store(key, data):
+    try:
+        cache.set(key, data, RESPONSE_TIMEOUT)
+    except RedisError as e:
+        logger.warning(f"[response-cache] Failed to store response: {e}")
+
+
+def _release(lock):
+    try:
+        cache.delete(lock)
+    except RedisError:
+        pass
+
+
+def cached_response(key_func, build):
+    """
+    Response с данными из кеша по ключу key_func() или построенный
+    build(). Кешируются только ответы 200. Пока один запрос строит ответ
+    для холодного ключа, остальные ждут до LOCK_WAIT секунд, а потом
+    строят сами. Если Redis недоступен — ответ строится без кеша.
+    """
+    try:
+        key = key_func()
+        lock = f'{key}:lock'
+        locked = False
+        data = cache.get(key)
+        if data is None:
+            locked = cache.add(lock, 1, LOCK_TIMEOUT)
+            if not locked:
+                data = _wait_for(key)
+    except RedisError as e:
+        logger.warning(f"[response-cache] Cache unavailable: {e}")
+        return build()
+
+    if data is not None:
+        return Response(data)
+    if not locked:
+        return build()
+    try:
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            _store(key, response.data)
+    finally:
+        _release(lock)
+    return response
@@ -0,0 +1,101 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Listing, ListingImage, ListingVideo, PendingFileDeletion
+
+logger = logging.getLogger(__name__)
+
+# Объявлений на одну транзакцию: каскад (картинки, видео, избранное,
+# беседы, сообщения) собирается только для этой пачки
+DELETE_BATCH_SIZE = 200
+FILE_BATCH_SIZE = 500
+FILE_DELETE_WORKERS = 8
+
+
+def _media_names(listing_ids):
+    names = []
+    for name, variants in ListingImage.objects.filter(listing_id__in=listing_ids).values_list('image', 'variants'):
+        names.append(name)
+        for formats in variants.values():
+            names.extend(formats.values())
+    names.extend(ListingVideo.objects.filter(listing_id__in=listing_ids).values_list('video', flat=True))
+    return [name for name in names if name]
+
+
+def delete_listing_batch(queryset, batch_size=DELETE_BATCH_SIZE):
+    """
+    Удаляет одну пачку объявлений из queryset в короткой транзакции.
+    Их медиафайлы ставятся в очередь PendingFileDeletion в той же
+    транзакции. Возвращает число удалённых объявлений (0 — всё удалено).
+    """
+    with transaction.atomic():
+        ids = list(
+            queryset.order_by('id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        PendingFileDeletion.objects.bulk_create(
+            [PendingFileDeletion(name=name) for name in _media_names(ids)]
+        )
+        Listing.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def _delete_file(name):
+    try:
+        default_storage.delete(name)
+        return True
+    except Exception as e:
+        logger.warning(f"[retention] Failed to delete {name}: {e}")
+        return False
+
+
+def drain_pending_files(batch_size=FILE_BATCH_SIZE, workers=FILE_DELETE_WORKERS):
+    """
+    Стирает файлы из очереди PendingFileDeletion параллельно (локальное
+    хранилище или S3). Строки с not_before в будущем пропускаются,
+    неудачные остаются в очереди до следующего запуска.
+    Возвращает число удалённых файлов.
+    """
+    now = timezone.now()
+    deleted = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(
+                PendingFileDeletion.objects.filter(id__gt=last_id, not_before__lte=now)
+                .order_by('id').values_list('id', 'name')[:batch_size]
+            )
+            if not batch:
+                return deleted
+            last_id = batch[-1][0]
+            results = pool.map(_delete_file, [name for _, name in batch])
+            done = [pk for (pk, _), ok in zip(batch, results) if ok]
+            PendingFileDeletion.objects.filter(id__in=done).delete()
+            deleted += len(done)
+
+
+def purge_listings(queryset, progress=None):
+    """
+    Удаляет объявления пачками, после каждой пачки чистит файлы.
+    Идемпотентна: после падения следующий запуск продолжит с оставшихся
+    строк и недочищенных файлов. progress(listings, files) вызывается
+    после каждой пачки.
+    """
+    totals = {'listings': 0, 'files': drain_pending_files()}
+    while True:
+        deleted = delete_listing_batch(queryset)
+        if not deleted:
+            break
+        totals['listings'] += deleted
+        totals['files'] += drain_pending_files()
+        logger.info(f"[retention] Deleted {totals['listings']} listings, {totals['files']} files so far")
+        if progress:
+            progress(totals['listings'], totals['files'])
+    return totals
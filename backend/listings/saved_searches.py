@@ -0,0 +1,135 @@
+from django.db.models import Exists, Q
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from .category_tree import get_category_tree
+from .filters import ListingFilter
+from .models import Listing, SavedSearch
+from .search import search_listings
+
+# Параметры ленты, которые можно сохранить (status не сохраняется:
+# оповещаем только об активных объявлениях)
+SAVED_SEARCH_PARAMS = (
+    'q', 'category', 'category_slug', 'price_min', 'price_max', 'location', 'near', 'radius_km',
+)
+# Проверок кандидатов в одном SQL (по EXISTS на поиск)
+MATCH_CHUNK_SIZE = 200
+
+
+def _query_dict(params):
+    data = QueryDict(mutable=True)
+    for key, value in params.items():
+        if isinstance(value, list):
+            data.setlist(key, [str(item) for item in value])
+        else:
+            data[key] = str(value)
+    return data
+
+
+def normalize_params(params):
+    """
+    Проверяет параметры тем же ListingFilter, что и лента, и приводит
+    к виду для хранения: пустые отброшены, ?search= → q, category — список id.
+    """
+    if not isinstance(params, dict):
+        raise ValidationError('Ожидается объект с параметрами поиска')
+    params = dict(params)
+    if 'search' in params and 'q' not in params:
+        params['q'] = params.pop('search')
+    unknown = set(params) - set(SAVED_SEARCH_PARAMS)
+    if unknown:
+        raise ValidationError(f'Неизвестные параметры: {", ".join(sorted(unknown))}')
+
+    normalized = {}
+    for key, value in params.items():
+        if key == 'category':
+            values = value if isinstance(value, list) else [value]
+            values = [str(item).strip() for item in values if str(item).strip()]
+            if values:
+                normalized[key] = values
+        elif value is not None and str(value).strip():
+            normalized[key] = str(value).strip()
+    if not normalized:
+        raise ValidationError('Задайте хотя бы один параметр поиска')
+
+    filterset = ListingFilter(_query_dict(normalized), queryset=Listing.objects.none())
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    # near/radius_km проверяются при построении queryset (без запроса в БД)
+    filterset.qs
+    cleaned = filterset.form.cleaned_data
+    if 'category' in normalized:
+        normalized['category'] = sorted(category.pk for category in cleaned['category'])
+    for key in ('price_min', 'price_max', 'radius_km'):
+        if key in normalized:
+            normalized[key] = str(cleaned[key])
+    return normalized
+
+
+def candidate_searches(listing):
+    """
+    Поиски, которые могут совпасть с объявлением, по индексу
+    (category, price_min, price_max): остальные параметры проверяются точно.
+    """
+    return (
+        SavedSearch.objects
+        .filter(
+            Q(category__isnull=True) | Q(category_id=listing.category_id),
+            Q(price_min__isnull=True) | Q(price_min__lte=listing.price),
+            Q(price_max__isnull=True) | Q(price_max__gte=listing.price),
+        )
+        .exclude(user_id=listing.owner_id)
+        .select_related('user')
+        .order_by('id')
+    )
+
+
+def _category_matches(search, listing, tree):
+    params = search.params
+    if params.get('category') and listing.category_id not in {int(pk) for pk in params['category']}:
+        return False
+    if params.get('category_slug'):
+        node = tree.get(listing.category_id)
+        if node is None or node['slug'].lower() != params['category_slug'].lower():
+            return False
+    return True
+
+
+def _filtered(search, queryset):
+    # категория уже проверена по дереву: ModelMultipleChoiceFilter ходил бы в БД на каждый поиск
+    params = {key: value for key, value in search.params.items() if key not in ('category', 'category_slug', 'q')}
+    filterset = ListingFilter(_query_dict(params), queryset=queryset)
+    if not filterset.is_valid():
+        return None
+    try:
+        queryset = filterset.qs
+    except ValidationError:
+        return None
+    if search.params.get('q'):
+        queryset = search_listings(queryset, search.params['q'])
+    return queryset
+
+
+def matching_searches(listing):
+    """
+    Сохранённые поиски, которым соответствует объявление («перколяция»:
+    объявление прогоняется через поиски, а не поиски — по таблице).
+    Кандидаты отбираются по индексу, точная проверка — ListingFilter и
+    полнотекстовый поиск по одной строке, пачкой EXISTS в одном запросе.
+    """
+    tree = get_category_tree()
+    candidates = [search for search in candidate_searches(listing) if _category_matches(search, listing, tree)]
+    row = Listing.objects.filter(pk=listing.pk)
+    matched = []
+    for start in range(0, len(candidates), MATCH_CHUNK_SIZE):
+        checks = {}
+        for search in candidates[start:start + MATCH_CHUNK_SIZE]:
+            queryset = _filtered(search, Listing.objects.filter(pk=listing.pk))
+            if queryset is not None:
+                checks[f's{search.pk}'] = Exists(queryset.values('pk'))
+        if not checks:
+            continue
+        result = row.values(**checks).first() or {}
+        by_key = {f's{search.pk}': search for search in candidates[start:start + MATCH_CHUNK_SIZE]}
+        matched.extend(by_key[key] for key, found in result.items() if found)
+    return matched
@@ -0,0 +1,69 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+# Конфигурации Postgres для стемминга: контент у нас на русском, французском
+# и нидерландском. Колонка search_vector содержит лексемы всех трёх языков
+# (её поддерживает триггер из миграции 0002), поэтому запрос строим по каждой
+# конфигурации и объединяем через OR.
+SEARCH_CONFIGS = ('russian', 'french', 'dutch')
+
+
+def build_search_query(term):
+    """
+    Собирает tsquery из пользовательской строки (синтаксис websearch:
+    кавычки, OR, минус) для всех поддерживаемых языков.
+    """
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(term, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def search_listings(queryset, term):
+    """
+    Фильтрует объявления по GIN-индексу search_vector и аннотирует
+    релевантность (title — вес A, description — B, location — C).
+    ts_rank возвращает real; приводим к double precision, иначе значение
+    из курсора (float в Python) сравнивается с расширенным real неточно,
+    и объявления с одинаковым рангом выпадают или повторяются.
+    """
+    query = build_search_query(term)
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+
+
+class ListingSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по ?q= с сортировкой по релевантности.
+    ?search= поддерживается для старых клиентов. Явный ?ordering=
+    (OrderingFilter идёт следом) перекрывает сортировку по релевантности.
+    """
+    search_param = 'q'
+    legacy_search_param = 'search'
+
+    def get_search_term(self, request):
+        term = request.query_params.get(self.search_param)
+        if term is None:
+            term = request.query_params.get(self.legacy_search_param, '')
+        return term.replace('\x00', '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        if not term:
+            return queryset
+        return search_listings(queryset, term).order_by('-search_rank', '-created_at', '-id')
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Полнотекстовый поиск по названию, описанию и городу',
+                'schema': {'type': 'string'},
+            },
+        ]
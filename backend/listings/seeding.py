@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .models import Category
+
+# Синтетические данные для бенчмарков и проверки планов запросов.
+# Вызывать внутри транзакции, которая потом откатывается.
+
+SEED_LOCATIONS = [
+    'Brussels', 'Antwerpen', 'Gent', 'Charleroi', 'Liège', 'Brugge',
+    'Namur', 'Leuven', 'Mons', 'Aalst', 'Mechelen', 'Kortrijk',
+]
+# Примерные границы Бельгии
+LAT_RANGE = (49.5, 51.5)
+LON_RANGE = (2.55, 6.4)
+
+
+def seed_listings(rows, categories=10, images=False, favorites=0):
+    """
+    Вставляет rows объявлений одним INSERT ... SELECT generate_series:
+    случайные категория, город, координаты, цена, статус (90% active)
+    и время создания. images — по основной картинке на объявление,
+    favorites — столько объявлений в избранном у владельца.
+    Возвращает (owner, [category, ...]).
+    """
+    owner = get_user_model().objects.create(username='seed-owner', email='seed-owner@example.invalid')
+    created = [
+        Category.objects.create(name=f'Seed {i}', slug=f'seed-{i}')
+        for i in range(categories)
+    ]
+    with connection.cursor() as cursor:
+        # search_vector заполняет триггер: без него планы поиска
+        # строятся по NULL-векторам и не похожи на продакшн
+        cursor.execute(
+            """
+            INSERT INTO listings_listing (
+                title, slug, description, price, currency, category_id, location,
+                latitude, longitude, owner_id, status, is_featured, view_count,
+                created_at, updated_at
+            )
+            SELECT 'Listing ' || n, 'seed-' || n, '', round((random() * random() * 20000)::numeric, 2), 'EUR',
+                   (%s::int[])[1 + floor(random() * %s)::int],
+                   (%s::text[])[1 + floor(random() * %s)::int],
+                   %s + random() * %s, %s + random() * %s, %s,
+                   CASE WHEN random() < 0.9 THEN 'active' WHEN random() < 0.5 THEN 'pending' ELSE 'sold' END,
+                   false, floor(random() * 1000)::int,
+                   now() - n * interval '1 second', now()
+            FROM generate_series(1, %s) AS n
+            """,
+            [
+                [c.pk for c in created], len(created),
+                SEED_LOCATIONS, len(SEED_LOCATIONS),
+                LAT_RANGE[0], LAT_RANGE[1] - LAT_RANGE[0],
+                LON_RANGE[0], LON_RANGE[1] - LON_RANGE[0],
+                owner.pk, rows,
+            ],
+        )
+        if images:
+            cursor.execute(
+                """
+                INSERT INTO listings_listingimage (listing_id, image, is_primary, status, variants, created_at, updated_at)
+                SELECT id, 'listings/seed.jpg', true, 'ready', '{}', now(), now()
+                FROM listings_listing WHERE owner_id = %s
+                """,
+                [owner.pk],
+            )
+        if favorites:
+            cursor.execute(
+                """
+                INSERT INTO listings_favorite (user_id, listing_id, created_at)
+                SELECT %s, id, now() - random() * interval '30 days'
+                FROM listings_listing WHERE owner_id = %s
+                ORDER BY random() LIMIT %s
+                """,
+                [owner.pk, owner.pk, favorites],
+            )
+        for table in ('listings_listing', 'listings_listingimage', 'listings_favorite', 'listings_category'):
+            cursor.execute(f'ANALYZE {table}')
+    return owner, created
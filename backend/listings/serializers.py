@@ -1,6 +1,13 @@
 from slugify import slugify
+from drf_spectacular.utils import extend_schema_field
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Listing, ListingImage, ListingVideo, Favorite
+from .category_tree import get_category_tree
+from .models import Category, Listing, ListingImage, ListingVideo, Favorite, SavedSearch
+from .images import ImageRejected, check_image_header
+from .saved_searches import normalize_params
+from .tasks import process_listing_image
 from users.serializers import UserSerializer
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -11,13 +18,23 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'parent', 'icon', 'slug', 'children')
     
     def get_children(self, obj) -> list:
-        children = Category.objects.filter(parent=obj)
-        return CategorySerializer(children, many=True).data if children.exists() else []
+        # .all() берёт prefetch_related('children'), если он есть
+        return CategorySerializer(obj.children.all(), many=True).data
+
+def validate_image_header(img):
+    # размеры по заголовку, до декодирования — отсекаем декомпрессионные бомбы
+    try:
+        check_image_header(img)
+    except ImageRejected as e:
+        raise serializers.ValidationError(str(e))
+    img.seek(0)
+    return img
+
 
 # Базовый сериализатор для чтения (и удаления/специальных случаев)
 class ListingSerializer(serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
-    category_detail = CategorySerializer(source='category', read_only=True)
+    category_detail = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
     videos = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
@@ -33,6 +50,11 @@ class ListingSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('owner', 'view_count', 'created_at', 'updated_at')
     
+    @extend_schema_field(CategorySerializer)
+    def get_category_detail(self, obj):
+        # из дерева в памяти процесса, без JOIN и запросов на подкатегории
+        return get_category_tree().get(obj.category_id)
+
     def get_images(self, obj) -> list:
         return ListingImageSerializer(obj.images.all(), many=True).data
 
@@ -40,6 +62,12 @@ class ListingSerializer(serializers.ModelSerializer):
         return ListingVideoSerializer(obj.videos.all(), many=True).data
 
     def get_is_favorited(self, obj) -> bool:
+        # закешированный набор id из контекста view — без запроса на каждую строку
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            return obj.pk in favorite_ids
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Favorite.objects.filter(user=request.user, listing=obj).exists()
@@ -93,6 +121,9 @@ class ListingCreateSerializer(serializers.ModelSerializer):
         if not (request and request.user.is_staff):
             self.fields['is_featured'].read_only = True
 
+    def validate_images(self, images):
+        return [validate_image_header(img) for img in images]
+
     def create(self, validated_data):
         images_data = validated_data.pop('images', [])
         videos_data = validated_data.pop('videos', [])
@@ -101,11 +132,13 @@ class ListingCreateSerializer(serializers.ModelSerializer):
         listing = Listing.objects.create(**validated_data)
 
         for i, image_data in enumerate(images_data):
-            ListingImage.objects.create(
+            image = ListingImage.objects.create(
                 listing=listing,
                 image=image_data,
                 is_primary=(i == 0)
             )
+            # варианты строятся в фоне, как и в ListingImageViewSet
+            transaction.on_commit(lambda pk=image.pk: process_listing_image.delay(pk))
         for video_data in videos_data:
             ListingVideo.objects.create(
                 listing=listing,
@@ -136,10 +169,19 @@ class ListingUpdateSerializer(serializers.ModelSerializer):
 
 class ListingImageSerializer(serializers.ModelSerializer):
     image = serializers.ImageField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = ListingImage
-        fields = ('id', 'image', 'is_primary', 'created_at')
+        fields = ('id', 'image', 'is_primary', 'status', 'variants', 'created_at')
+        read_only_fields = ('status',)
+
+    def get_variants(self, obj) -> dict:
+        # {variant: {format: url}}; пусто, пока картинка не обработана
+        return {
+            variant: {fmt: default_storage.url(name) for fmt, name in formats.items()}
+            for variant, formats in obj.variants.items()
+        }
 
     def validate_image(self, img):
         max_mb = 2  # Максимальный размер исходного файла в МБ
@@ -148,7 +190,7 @@ class ListingImageSerializer(serializers.ModelSerializer):
                 f'Максимальный размер файла — {max_mb} МБ. ' \
                 f'Ваш файл {(img.size/(1024*1024)):.1f} МБ.'
             )
-        return img
+        return validate_image_header(img)
 
 class ListingVideoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -168,6 +210,30 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'listing', 'listing_id', 'created_at')
         read_only_fields = ('user', 'created_at')
 
+class SavedSearchSerializer(serializers.ModelSerializer):
+    MAX_PER_USER = 50
+
+    class Meta:
+        model = SavedSearch
+        fields = ('id', 'name', 'params', 'created_at')
+        read_only_fields = ('created_at',)
+
+    def validate_params(self, value):
+        return normalize_params(value)
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if self.instance is None and SavedSearch.objects.filter(user=user).count() >= self.MAX_PER_USER:
+            raise serializers.ValidationError(f'Не больше {self.MAX_PER_USER} сохранённых поисков')
+        return attrs
+
 class CitySerializer(serializers.Serializer):
+    # ключи как в searchJSON GeoNames, см. listings/gazetteer.py
     name = serializers.CharField()
-    admin = serializers.CharField()
+    adminName1 = serializers.CharField()
+    lat = serializers.FloatField()
+    lng = serializers.FloatField()
+    population = serializers.IntegerField()
+
+class CityListSerializer(serializers.Serializer):
+    geonames = CitySerializer(many=True)
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .category_tree import invalidate_category_tree
+from .favorites import invalidate_favorite_ids
+from .models import Category, Favorite, Listing, ListingImage, ListingVideo
+from .response_cache import ALL_LISTINGS, bump, bump_listing, category_version, listing_version
+from .tasks import match_saved_searches
+
+# Поля, от которых зависит совпадение с сохранёнными поисками
+SAVED_SEARCH_FIELDS = {'title', 'description', 'price', 'category', 'location', 'status'}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # после коммита, чтобы другие процессы не перечитали старое дерево
+    transaction.on_commit(invalidate_category_tree)
+    transaction.on_commit(lambda: bump(category_version(instance.pk)))
+
+
+@receiver(pre_save, sender=Listing)
+def remember_listing_category(sender, instance, update_fields=None, **kwargs):
+    # при переносе в другую категорию устаревают выдачи обеих
+    instance._previous_category_id = None
+    if instance.pk and (update_fields is None or 'category' in update_fields):
+        instance._previous_category_id = (
+            Listing.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def listing_changed(sender, instance, **kwargs):
+    names = {ALL_LISTINGS, listing_version(instance.slug), category_version(instance.category_id)}
+    previous = getattr(instance, '_previous_category_id', None)
+    if previous:
+        names.add(category_version(previous))
+    transaction.on_commit(lambda: bump(*names))
+
+
+@receiver(post_save, sender=Listing)
+def match_listing_to_saved_searches(sender, instance, created, update_fields=None, **kwargs):
+    if instance.status != 'active':
+        return
+    if not created and update_fields is not None and not SAVED_SEARCH_FIELDS & set(update_fields):
+        return
+    # search_vector проставит триггер в той же транзакции — сопоставляем после коммита
+    transaction.on_commit(lambda: match_saved_searches.delay([instance.pk]))
+
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_save, sender=ListingVideo)
+def listing_media_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_listing(instance.listing_id))
+
+
+@receiver(post_delete, sender=ListingImage)
+@receiver(post_delete, sender=ListingVideo)
+def listing_media_deleted(sender, instance, origin=None, **kwargs):
+    # каскад от удаления самого объявления: его кеши сбросит listing_changed
+    if isinstance(origin, Listing) or getattr(origin, 'model', None) is Listing:
+        return
+    # удаление не оставляет отметки времени у медиа: сдвигаем updated_at объявления (входит в ETag)
+    Listing.objects.filter(pk=instance.listing_id).update(updated_at=timezone.now())
+    transaction.on_commit(lambda: bump_listing(instance.listing_id))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorite_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_favorite_ids(instance.user_id))
@@ -1,24 +1,176 @@
+import logging
+import os
 from datetime import timedelta
+from urllib.parse import urlsplit
+
+import pyvips
+import requests
+from django.core.files import File
 from django.utils import timezone
 from celery import shared_task
 
-from .models import Listing
+from .counters import flush_view_counts
+from .feeds import generate_feeds
+from .gazetteer import refresh_cities
+from .images import ImageRejected, download_image, render_variants, store_variants
+from .models import Listing, ListingImage
+from .response_cache import bump_listing
+from .retention import purge_listings
+from .saved_searches import matching_searches
+from config.redis_client import get_redis, release_lock
+from notifications.fanout import notify_saved_search_matches
 
-@shared_task
-def delete_old_listings():
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True)
+def delete_old_listings(self):
     """
     Задача, которая ежедневно удаляет все объявления, старше 60 дней.
+    Удаляет пачками в коротких транзакциях и чистит их файлы в хранилище;
+    если воркер упал, следующий запуск продолжит с того же места.
     """
     # Считаем дату 60 дней назад от сейчас
     cutoff_date = timezone.now() - timedelta(days=60)
-    
+
     # Выбираем все объекты Listing, у которых created_at меньше cutoff_date
     old_items = Listing.objects.filter(created_at__lt=cutoff_date)
-    
-    # Если нужно, можно сначала сохранить их идентификаторы в лог или статистику:
-    old_count = old_items.count()
-    
-    # Удаляем все сразу (bulk delete)
-    old_items.delete()
-    
-    return f'Deleted {old_count} listings older than {cutoff_date.isoformat()}'
+
+    # Один прогон за раз: параллельные запуски только мешали бы друг другу
+    lock = get_redis().lock('listings:retention', timeout=6 * 60 * 60)
+    if not lock.acquire(blocking=False):
+        return 'Retention is already running'
+    try:
+        def progress(listings, files):
+            self.update_state(state='PROGRESS', meta={'listings': listings, 'files': files})
+
+        totals = purge_listings(old_items, progress=progress)
+    finally:
+        release_lock(lock)
+
+    return (
+        f"Deleted {totals['listings']} listings older than {cutoff_date.isoformat()}, "
+        f"{totals['files']} media files"
+    )
+
+
+@shared_task
+def flush_listing_view_counts():
+    """
+    Переносит буферизованные в Redis просмотры в Listing.view_count.
+    """
+    # перекрывающиеся запуски beat прибавили бы один и тот же буфер дважды
+    lock = get_redis().lock('listings:flush-views', timeout=5 * 60)
+    if not lock.acquire(blocking=False):
+        return 'View count flush is already running'
+    try:
+        updated = flush_view_counts()
+    finally:
+        release_lock(lock)
+    return f'Flushed view counts for {updated} listings'
+
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def process_listing_image(self, image_id):
+    """
+    Строит адаптивные варианты (thumb/card/full, WebP + JPEG) для
+    ListingImage в фоне: запрос на загрузку только сохраняет оригинал.
+    """
+    image = ListingImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return f'ListingImage {image_id} no longer exists'
+
+    ListingImage.objects.filter(pk=image_id).update(status='processing')
+    try:
+        with image.image.open('rb') as f:
+            rendered = render_variants(f)
+        variants = store_variants(image, rendered)
+    except (pyvips.Error, ImageRejected) as e:
+        logger.warning(f"[images] Failed to process ListingImage {image_id}: {e}")
+        ListingImage.objects.filter(pk=image_id).update(status='failed', updated_at=timezone.now())
+        bump_listing(image.listing_id)
+        return f'ListingImage {image_id} failed'
+    except OSError as e:
+        # хранилище недоступно — пробуем позже
+        ListingImage.objects.filter(pk=image_id).update(status='pending')
+        raise self.retry(exc=e)
+
+    # update() не трогает auto_now и не шлёт сигналы: отметку и версии кеша ставим сами
+    ListingImage.objects.filter(pk=image_id).update(status='ready', variants=variants, updated_at=timezone.now())
+    bump_listing(image.listing_id)
+    return f'ListingImage {image_id} processed'
+
+
+@shared_task
+def fetch_listing_images(listing_id, urls):
+    """
+    Скачивает картинки импортированного объявления по ссылкам, сохраняет
+    их как ListingImage (первая — основная, если основной ещё нет)
+    и ставит построение вариантов. Битые ссылки пропускаются: повтор
+    всей задачи продублировал бы уже сохранённые картинки.
+    """
+    listing = Listing.objects.filter(pk=listing_id).first()
+    if listing is None:
+        return f'Listing {listing_id} no longer exists'
+
+    has_primary = listing.images.filter(is_primary=True).exists()
+    stored = 0
+    for url in urls:
+        try:
+            tmp = download_image(url)
+        except (ImageRejected, requests.RequestException) as e:
+            logger.warning(f"[import] Skipping image {url} for listing {listing_id}: {e}")
+            continue
+        with tmp:
+            image = ListingImage(listing=listing, is_primary=not has_primary)
+            image.image.save(os.path.basename(urlsplit(url).path) or 'image.jpg', File(tmp))
+        has_primary = True
+        process_listing_image.delay(image.pk)
+        stored += 1
+    return f'Stored {stored} of {len(urls)} images for listing {listing_id}'
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=15 * 60)
+def refresh_belgian_cities(self):
+    """
+    Обновляет справочник городов из дампа GeoNames.
+    Эндпоинт belgian-cities читает только локальные данные.
+    """
+    try:
+        count = refresh_cities()
+    except requests.RequestException as e:
+        raise self.retry(exc=e)
+    return f'Loaded {count} Belgian populated places'
+
+
+@shared_task
+def generate_listing_feeds():
+    """
+    Обновляет sitemap и партнёрский фид активных объявлений в хранилище:
+    перегенерируются только изменившиеся шарды.
+    """
+    lock = get_redis().lock('listings:feeds', timeout=60 * 60)
+    if not lock.acquire(blocking=False):
+        return 'Feed generation is already running'
+    try:
+        result = generate_feeds()
+    finally:
+        release_lock(lock)
+    return f"Regenerated {result['regenerated']} of {result['shards']} feed shards, removed {result['removed']}"
+
+
+@shared_task
+def match_saved_searches(listing_ids):
+    """
+    Сопоставляет новые/изменённые объявления с сохранёнными поисками
+    и рассылает совпадения одной пачкой уведомлений.
+    """
+    matches = [
+        (listing, search)
+        for listing in Listing.objects.filter(pk__in=listing_ids, status='active').order_by('pk')
+        for search in matching_searches(listing)
+    ]
+    if not matches:
+        return 'No saved search matches'
+    sent = notify_saved_search_matches(matches)
+    return f'{len(matches)} saved search matches, {sent} notifications sent'
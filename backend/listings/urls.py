@@ -6,9 +6,13 @@ router = DefaultRouter()
 router.register(r'categories', views.CategoryViewSet)
 router.register(r'images', views.ListingImageViewSet)
 router.register(r'videos', views.ListingVideoViewSet)
+# до r'': иначе saved-searches/ примет за slug объявления
+router.register(r'saved-searches', views.SavedSearchViewSet, basename='saved-search')
 router.register(r'', views.ListingViewSet)
 
 urlpatterns = [
     path('belgian-cities/', views.BelgianCitiesView.as_view(), name='belgian-cities'),
+    path('sitemap.xml', views.SitemapIndexView.as_view(), name='listings-sitemap'),
+    path('feed/', views.ListingFeedView.as_view(), name='listings-feed'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,57 @@
+import logging
+import time
+
+from redis import RedisError
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    Объект в памяти процесса (дерево категорий, индекс городов), общий
+    для всех запросов. Номер версии лежит в Redis: не чаще раза в
+    check_interval секунд процесс сверяет с ним свою копию и при
+    расхождении перестраивает её через build(). Если Redis недоступен,
+    копия перестраивается при каждой сверке.
+    """
+
+    def __init__(self, version_key, build, check_interval, tag):
+        self.version_key = version_key
+        self.build = build
+        self.check_interval = check_interval
+        self.tag = tag
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _current_version(self):
+        try:
+            return int(get_redis().get(self.version_key) or 0)
+        except RedisError as e:
+            logger.warning(f"[{self.tag}] Redis unavailable, rebuilding: {e}")
+            return None
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.check_interval:
+            return self._value
+
+        version = self._current_version()
+        if self._value is None or version is None or self._version != version:
+            self._value = self.build()
+            self._version = version
+        self._checked_at = now
+        return self._value
+
+    def invalidate(self):
+        """
+        Поднимает версию: этот процесс перестроит копию сразу,
+        остальные — не позже чем через check_interval.
+        """
+        self._value = None
+        try:
+            get_redis().incr(self.version_key)
+        except RedisError as e:
+            logger.warning(f"[{self.tag}] Failed to bump version: {e}")
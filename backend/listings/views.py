@@ -1,16 +1,33 @@
-import requests, pyvips
-
-from django.conf import settings
-from django.core.files.base import ContentFile
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.http import parse_etags
 from django_filters import rest_framework as filters
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Category, Listing, ListingImage, ListingVideo, Favorite
+from .bulk_import import IMPORT_FORMATS, ListingImporter
+from .category_tree import get_category_tree
+from .conditional import listing_validators, not_modified, set_validators
+from .counters import get_visitor_key, record_view
+from .facets import get_facets
+from .favorites import get_favorite_ids
+from .filters import ListingFilter
+from .gazetteer import get_city_index
+from .models import Category, FeedShard, Listing, ListingImage, ListingVideo, Favorite, SavedSearch
+from .pagination import ListingCursorPagination
 from .permissions import IsOwnerOrAdmin
+from .response_cache import cached_response, detail_key, is_cacheable, list_key
+from .search import ListingSearchFilter
+from .tasks import process_listing_image
 from .serializers import (
     CategorySerializer,
     ListingSerializer,
@@ -19,32 +36,11 @@ from .serializers import (
     ListingImageSerializer,
     ListingVideoSerializer,
     FavoriteSerializer,
-    CitySerializer,
+    CityListSerializer,
+    SavedSearchSerializer,
 )
 
 
-def process_image_with_vips(image_file, max_size=1280, quality=75):
-    """
-    Обрабатывает изображение через pyvips: масштабирует так, чтобы
-    ни ширина, ни высота не превышали max_size, конвертирует в JPEG,
-    и возвращает ContentFile.
-    """
-    # читаем байты
-    buf = image_file.read()
-    # создаём vips-образ
-    image = pyvips.Image.new_from_buffer(buf, "")
-    # вычисляем масштаб
-    scale = min(max_size / image.width, max_size / image.height, 1.0)
-    if scale < 1.0:
-        image = image.resize(scale)
-    # сохраняем в JPEG-буфер
-    jpeg_buf = image.jpegsave_buffer(Q=quality)
-    # формируем имя
-    base, _ = image_file.name.rsplit('.', 1)
-    name = f"{base}.jpg"
-    return ContentFile(jpeg_buf, name=name)
-
-
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     Для небезопасных методов (POST/PUT/PATCH/DELETE) — только владелец.
@@ -56,32 +52,48 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         return obj.owner == request.user
 
 
-class ListingFilter(filters.FilterSet):
-    price_min = filters.NumberFilter(field_name="price", lookup_expr='gte')
-    price_max = filters.NumberFilter(field_name="price", lookup_expr='lte')
-    category = filters.ModelMultipleChoiceFilter(
-        queryset=Category.objects.all(),
-        field_name='category'
-    )
-    category_slug = filters.CharFilter(field_name="category__slug", lookup_expr="iexact")
-
-    class Meta:
-        model = Listing
-        fields = [
-            'price_min', 'price_max',
-            'category', 'category_slug',
-            'location', 'status'
-        ]
-
-
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    Только чтение категорий верхнего уровня
+    Только чтение категорий верхнего уровня.
+    Отдаётся из закешированного дерева (listings/category_tree.py) с ETag.
     """
     queryset = Category.objects.filter(parent=None)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
+    def get_etag(self, tree):
+        # версия дерева + параметры запроса (страница)
+        key = f'{tree.etag}:{self.request.get_full_path()}'
+        return f'"categories-{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def tree_response(self, tree, build_response):
+        etag = self.get_etag(tree)
+        if etag in parse_etags(self.request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build_response()
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        tree = get_category_tree()
+
+        def build_response():
+            page = self.paginate_queryset(tree.roots)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(tree.roots)
+
+        return self.tree_response(tree, build_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        tree = get_category_tree()
+        node = tree.get(int(kwargs['pk'])) if kwargs['pk'].isdigit() else None
+        if node is None or node['parent'] is not None:
+            raise NotFound()
+        return self.tree_response(tree, lambda: Response(node))
+
 
 class ListingViewSet(viewsets.ModelViewSet):
     """
@@ -89,10 +101,21 @@ class ListingViewSet(viewsets.ModelViewSet):
     """
     queryset = Listing.objects.all()
     lookup_field = "slug"
-    filter_backends = [filters.DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [filters.DjangoFilterBackend, ListingSearchFilter, OrderingFilter]
     filterset_class = ListingFilter
-    search_fields = ['title', 'description', 'location']
     ordering_fields = ['created_at', 'price', 'view_count']
+    pagination_class = ListingCursorPagination
+
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve', 'my_listings', 'favorites']:
+            return Listing.objects.for_api()
+        return super().get_queryset()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ['list', 'retrieve', 'my_listings', 'favorites']:
+            context['favorite_ids'] = get_favorite_ids(self.request.user)
+        return context
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -102,7 +125,7 @@ class ListingViewSet(viewsets.ModelViewSet):
         return ListingSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'facets']:
             return [permissions.AllowAny()]
         if self.action in ['create', 'my_listings', 'favorites', 'favorite', 'unfavorite']:
             return [permissions.IsAuthenticated()]
@@ -110,12 +133,83 @@ class ListingViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated(), IsOwnerOrAdmin()]
         return [permissions.IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        return cached_response(
+            lambda: list_key(request),
+            lambda: super(ListingViewSet, self).list(request, *args, **kwargs),
+        )
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # сначала дешёвые валидаторы: на 304 сериализатор не запускается
+        validators = listing_validators(kwargs[self.lookup_field], request.user)
+        if validators is not None:
+            response = not_modified(request, validators)
+            if response is not None:
+                if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                    record_view(validators.pk, get_visitor_key(request))
+                return response
+
+        def build():
+            return Response(self.get_serializer(self.get_object()).data)
+
+        if is_cacheable(request):
+            response = cached_response(lambda: detail_key(request, kwargs[self.lookup_field]), build)
+        else:
+            response = build()
+        # без UPDATE горячей строки: просмотр уходит в буфер Redis (и для ответа из кеша)
+        if record_view(response.data['id'], get_visitor_key(request)):
+            response.data['view_count'] += 1
+        if validators is not None:
+            set_validators(response, validators, request.user)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Счётчики для боковой панели фильтров (категории, города, цена)
+        при текущих фильтрах — одним агрегирующим запросом.
+        """
+        return Response(get_facets(request, self.filter_queryset(self.get_queryset())))
+
+    IMPORT_CONTENT_TYPES = {
+        'text/csv': 'csv',
+        'application/x-ndjson': 'jsonl',
+        'application/jsonl': 'jsonl',
+        'application/x-jsonlines': 'jsonl',
+    }
+    IMPORT_MAX_ROWS = 10_000
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Массовая загрузка объявлений (CSV или JSONL) телом запроса
+        или файлом в поле file формы. Формат — по Content-Type,
+        расширению файла или ?type=csv|jsonl. Ответ — отчёт с ошибками
+        по номерам строк.
+        """
+        fmt = request.query_params.get('type')
+        if request.content_type.startswith('multipart/form-data'):
+            stream = request.FILES.get('file')
+            if stream is not None and fmt is None:
+                fmt = stream.name.rsplit('.', 1)[-1].lower()
+        else:
+            stream = request.stream
+            fmt = fmt or self.IMPORT_CONTENT_TYPES.get(request.content_type.split(';')[0].strip())
+        if stream is None:
+            raise ValidationError({'file': 'Пустой запрос'})
+        if fmt not in IMPORT_FORMATS:
+            raise ValidationError({'type': f'Поддерживаются форматы: {", ".join(IMPORT_FORMATS)}'})
+
+        report = ListingImporter(request.user, max_rows=self.IMPORT_MAX_ROWS).run(stream, fmt)
+        if report['created']:
+            code = status.HTTP_201_CREATED
+        elif report['failed']:
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_200_OK
+        return Response(report, status=code)
 
     @action(detail=True, methods=['post'])
     def favorite(self, request, slug=None):
@@ -136,7 +230,7 @@ class ListingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def my_listings(self, request):
-        qs = Listing.objects.filter(owner=request.user)
+        qs = self.get_queryset().filter(owner=request.user)
         page = self.paginate_queryset(qs)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -146,8 +240,13 @@ class ListingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def favorites(self, request):
-        favs = Favorite.objects.filter(user=request.user)
-        listings = [f.listing for f in favs]
+        # queryset, а не список: курсор пагинирует по времени добавления в избранное
+        listings = (
+            self.get_queryset()
+            .filter(favorited_by__user=request.user)
+            .annotate(favorited_at=F('favorited_by__created_at'))
+            .order_by('-favorited_at')
+        )
         page = self.paginate_queryset(listings)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -179,12 +278,9 @@ class ListingImageViewSet(viewsets.ModelViewSet):
         if listing.owner != self.request.user:
             raise permissions.PermissionDenied("Можно добавлять фото только к своим объявлениям")
 
-        image_file = self.request.FILES.get('image')
-        if image_file:
-            processed = process_image_with_vips(image_file)
-            serializer.save(listing=listing, image=processed)
-        else:
-            serializer.save(listing=listing)
+        # сохраняем оригинал и сразу отвечаем, варианты строит Celery
+        image = serializer.save(listing=listing)
+        transaction.on_commit(lambda: process_listing_image.delay(image.pk))
 
 
 class ListingVideoViewSet(viewsets.ModelViewSet):
@@ -211,25 +307,92 @@ class ListingVideoViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("Можно добавлять видео только к своим объявлениям")
         serializer.save(listing=listing)
         
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    Сохранённые поиски текущего пользователя. О новых подходящих
+    объявлениях приходят уведомления (listings/saved_searches.py).
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
 class BelgianCitiesView(APIView):
+    """
+    Города Бельгии с автодополнением (?q=brux, без учёта диакритики).
+    Отдаётся из индекса в памяти (listings/gazetteer.py), без запросов в GeoNames.
+    Формат ответа прежний: {"geonames": [{"name", "adminName1", ...}]}.
+    """
     permission_classes = [permissions.AllowAny]
-    serializer_class = CitySerializer
+    serializer_class = CityListSerializer
+    default_limit = 1000
+    max_limit = 1000
 
     def get(self, request):
-        username = getattr(settings, 'GEONAMES_USERNAME', None)
-        if not username:
-            return Response({'error': 'GeoNames username is not configured'}, status=500)
-
+        index = get_city_index()
+        query = request.query_params.get('q', '')
         try:
-            geo_url = 'http://api.geonames.org/searchJSON'
-            params = {
-                'country': 'BE',
-                'featureClass': 'P',
-                'maxRows': 1000,
-                'username': username
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        # отрицательный limit превратился бы в срез [:-1] — почти весь справочник
+        limit = max(1, min(limit, self.max_limit))
+
+        key = f'{index.etag}:{query}:{limit}'
+        etag = f'"cities-{hashlib.md5(key.encode()).hexdigest()}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'geonames': index.search(query, limit)})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
+
+
+class SitemapIndexView(APIView):
+    """
+    Индекс sitemap: ссылки на gzip-шарды в хранилище (listings/feeds.py).
+    Сами шарды отдаются хранилищем/CDN как статические файлы.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        entries = ''.join(
+            f'<sitemap><loc>{escape(request.build_absolute_uri(default_storage.url(shard.sitemap)))}</loc>'
+            f'<lastmod>{shard.last_modified.isoformat()}</lastmod></sitemap>\n'
+            for shard in FeedShard.objects.all()
+        )
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            f'{entries}</sitemapindex>\n'
+        )
+        response = HttpResponse(xml, content_type='application/xml')
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+
+class ListingFeedView(APIView):
+    """
+    Манифест партнёрского фида: шарды JSONL.gz с активными объявлениями
+    и временем их последнего изменения — партнёр скачивает только новые.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        shards = [
+            {
+                'url': request.build_absolute_uri(default_storage.url(shard.feed)),
+                'count': shard.count,
+                'last_modified': shard.last_modified,
             }
-            res = requests.get(geo_url, params=params, timeout=10)
-            res.raise_for_status()
-            return Response(res.json())
-        except requests.RequestException as e:
-            return Response({'error': 'GeoNames request failed'}, status=502)
+            for shard in FeedShard.objects.all()
+        ]
+        response = Response({'shards': shards})
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Notification
+from .serializers import NotificationSerializer
+from .unread import notifications_created
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Подписчиков на одну задачу: один SELECT, один INSERT, одна пачка group_send
+FANOUT_CHUNK_SIZE = 1000
+# group_send одновременно в одном event loop
+PUSH_CONCURRENCY = 100
+
+
+def listing_notification_content(listing):
+    return f'{listing.owner.username} разместил новое объявление: {listing.title}'
+
+
+def followers_chunk(owner_id, after, limit):
+    """Подписчики продавца с id > after по возрастанию id (keyset, без OFFSET)."""
+    return list(
+        User.objects.filter(following__following_id=owner_id, pk__gt=after)
+        .order_by('pk')[:limit]
+    )
+
+
+async def group_send_many(channel_layer, messages):
+    """group_send по списку (группа, событие) пачками; сбой одной группы не прерывает остальные."""
+    for start in range(0, len(messages), PUSH_CONCURRENCY):
+        batch = messages[start:start + PUSH_CONCURRENCY]
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, message) for group, message in batch),
+            return_exceptions=True,
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logger.warning(f"[notify] {len(failed)} of {len(batch)} pushes failed: {failed[0]}")
+
+
+def push_notifications(notifications):
+    """
+    Рассылает уведомления в WebSocket-группы получателей одним заходом
+    в event loop на всю пачку, а не async_to_sync на каждого.
+    recipient и sender должны быть уже подставлены — сериализатор
+    не делает запросов.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not notifications:
+        return
+    data = NotificationSerializer(notifications, many=True).data
+    messages = [
+        (f"notifications_{notification.recipient_id}", {"type": "notification", "notification": payload})
+        for notification, payload in zip(notifications, data)
+    ]
+    async_to_sync(group_send_many)(channel_layer, messages)
+
+
+def notify_followers_chunk(listing, after=0, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Уведомления о новом объявлении следующей пачке подписчиков продавца:
+    выборка подписчиков, bulk_create и рассылка в каналы.
+    Возвращает id последнего подписчика пачки или None, если больше некому.
+    """
+    owner = listing.owner
+    followers = followers_chunk(owner.pk, after, chunk_size)
+    if not followers:
+        return None
+
+    content = listing_notification_content(listing)
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient=follower,
+                sender=owner,
+                notification_type='subscription',
+                content=content,
+                object_id=listing.pk,
+            )
+            for follower in followers
+        ])
+    notifications_created([notification.recipient_id for notification in notifications])
+    # строки уже закоммичены: клиент, получивший push, найдёт их в API
+    push_notifications(notifications)
+
+    logger.debug(f"[notify] Listing {listing.pk}: {len(followers)} followers notified after #{after}")
+    return followers[-1].pk if len(followers) == chunk_size else None
+
+
+def notify_saved_search_matches(matches):
+    """
+    Уведомления о совпадениях сохранённых поисков одним bulk_create и
+    одной рассылкой: matches — [(listing, saved_search), ...] с
+    подгруженным saved_search.user. Одно уведомление на пользователя и
+    объявление, даже если совпало несколько его поисков или объявление
+    уже присылали (после редактирования). Возвращает число уведомлений.
+    """
+    listing_ids = {listing.pk for listing, _ in matches}
+    user_ids = {search.user_id for _, search in matches}
+    seen = set(
+        Notification.objects.filter(
+            notification_type='saved_search', object_id__in=listing_ids, recipient_id__in=user_ids,
+        ).values_list('recipient_id', 'object_id')
+    )
+    notifications = []
+    for listing, search in matches:
+        key = (search.user_id, listing.pk)
+        if key in seen:
+            continue
+        seen.add(key)
+        name = f' «{search.name}»' if search.name else ''
+        notifications.append(Notification(
+            recipient=search.user,
+            notification_type='saved_search',
+            content=f'Новое объявление по сохранённому поиску{name}: {listing.title}',
+            object_id=listing.pk,
+        ))
+    if not notifications:
+        return 0
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications)
+    notifications_created([notification.recipient_id for notification in notifications])
+    push_notifications(notifications)
+    return len(notifications)
@@ -0,0 +1,125 @@
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from listings.models import Category, Listing
+from notifications.fanout import (
+    FANOUT_CHUNK_SIZE, followers_chunk, listing_notification_content, notify_followers_chunk,
+)
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает рассылку уведомлений о новом объявлении подписчикам продавца: '
+        'по одному уведомлению и group_send на подписчика против пачек '
+        '(bulk_create + group_send в одном event loop). Всё откатывается в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=100_000)
+        parser.add_argument('--chunk-size', type=int, default=FANOUT_CHUNK_SIZE)
+        parser.add_argument(
+            '--baseline-sample', type=int, default=5_000,
+            help='Скольким подписчикам слать по одному (время экстраполируется)',
+        )
+        parser.add_argument(
+            '--in-memory-layer', action='store_true',
+            help='InMemoryChannelLayer вместо настроенного: мерить только БД',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmark requires PostgreSQL')
+
+        layers = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}} \
+            if options['in_memory_layer'] else None
+        with override_settings(**({'CHANNEL_LAYERS': layers} if layers else {})), transaction.atomic():
+            listing = self.seed(options['followers'])
+            self.measure_one_by_one(listing, options['baseline_sample'], options['followers'])
+            self.measure_batched(listing, options['chunk_size'])
+            transaction.set_rollback(True)
+
+    def seed(self, followers):
+        started = time.perf_counter()
+        owner = User.objects.create(username='fanout-seller', email='fanout-seller@example.invalid')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO users_user (
+                    password, is_superuser, username, first_name, last_name, email,
+                    is_staff, is_active, date_joined, avatar, bio
+                )
+                SELECT '!', false, 'fanout-' || n, '', '', 'fanout-' || n || '@example.invalid',
+                       false, true, now(), '', ''
+                FROM generate_series(1, %s) AS n
+                """,
+                [followers],
+            )
+            cursor.execute(
+                """
+                INSERT INTO users_subscription (follower_id, following_id, created_at)
+                SELECT id, %s, now() FROM users_user WHERE username LIKE 'fanout-%%' AND id <> %s
+                """,
+                [owner.pk, owner.pk],
+            )
+            for table in ('users_user', 'users_subscription'):
+                cursor.execute(f'ANALYZE {table}')
+        category = Category.objects.create(name='Fan-out', slug='fanout-benchmark')
+        # сигнал ставит задачу на on_commit — в откатываемой транзакции она не уйдёт
+        listing = Listing.objects.create(
+            title='Fan-out benchmark', description='', price=1, category=category,
+            location='Brussels', owner=owner,
+        )
+        self.stdout.write(f'Seeded {followers} followers in {time.perf_counter() - started:.1f} s')
+        return Listing.objects.select_related('owner').get(pk=listing.pk)
+
+    def measure_one_by_one(self, listing, sample, followers):
+        # прежний подход сигналов: create + сериализация + async_to_sync на каждого
+        if not sample:
+            return
+        channel_layer = get_channel_layer()
+        content = listing_notification_content(listing)
+        recipients = followers_chunk(listing.owner_id, 0, sample)
+        with transaction.atomic():
+            started = time.perf_counter()
+            for recipient in recipients:
+                notification = Notification.objects.create(
+                    recipient=recipient, sender=listing.owner, notification_type='subscription',
+                    content=content, object_id=listing.pk,
+                )
+                if channel_layer:
+                    async_to_sync(channel_layer.group_send)(
+                        f"notifications_{recipient.pk}",
+                        {"type": "notification", "notification": NotificationSerializer(notification).data},
+                    )
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        per_follower = elapsed / len(recipients)
+        self.stdout.write(
+            f'one by one: {len(recipients)} in {elapsed:.1f} s '
+            f'({per_follower * 1000:.2f} ms each, ~{per_follower * followers:.0f} s for {followers})'
+        )
+
+    def measure_batched(self, listing, chunk_size):
+        started = time.perf_counter()
+        chunks = 0
+        after = 0
+        # как цепочка задач fan_out_new_listing, только в одном процессе
+        while after is not None:
+            after = notify_followers_chunk(listing, after, chunk_size)
+            chunks += 1
+        elapsed = time.perf_counter() - started
+        notified = Notification.objects.filter(notification_type='subscription', object_id=listing.pk).count()
+        self.stdout.write(
+            f'   batched: {notified} in {elapsed:.1f} s over {chunks} chunks of {chunk_size} '
+            f'({elapsed / max(notified, 1) * 1000:.3f} ms each, {elapsed / chunks * 1000:.0f} ms per task)'
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('message', 'New Message'), ('favorite', 'New Favorite'), ('comment', 'New Comment'), ('price_change', 'Price Change'), ('status_change', 'Status Change'), ('subscription', 'New Listing from Subscription'), ('saved_search', 'New Listing for Saved Search')], max_length=20),
+        ),
+    ]
@@ -9,6 +9,7 @@ class Notification(models.Model):
         ('price_change', 'Price Change'),
         ('status_change', 'Status Change'),
         ('subscription', 'New Listing from Subscription'),
+        ('saved_search', 'New Listing for Saved Search'),
     ]
     
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
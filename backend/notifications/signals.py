@@ -1,55 +1,18 @@
-import logging
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.contrib.auth import get_user_model
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
-from chat.models import Message
-from .models import Notification
-from .serializers import NotificationSerializer
+from listings.models import Listing
+from .tasks import fan_out_new_listing
 
-logger = logging.getLogger(__name__)
-User = get_user_model()
+# Уведомления о сообщениях создаёт chat.persistence.save_message
+# и рассылает вместе с сообщением одним событием в группу беседы.
 
-@receiver(post_save, sender=Message)
-def create_message_notification(sender, instance, created, **kwargs):
-    if not created:
-        return
-
-    sender_user = instance.sender
-    conversation = instance.conversation
-    participants = conversation.participants.all()
-    # exclude the sender by primary key
-    recipients = participants.exclude(pk=sender_user.pk)
-
-    # --- DEBUG LOGGING ---
-    logger.debug(
-        f"[notify] New message {instance.pk} from user #{sender_user.pk} "
-        f"to conversation #{conversation.pk}. "
-        f"Participants: {[u.pk for u in participants]}, "
-        f"Recipients (excl. sender): {[u.pk for u in recipients]}"
-    )
-    # ---------------------
 
-    channel_layer = get_channel_layer()
-    for recipient in recipients:
-        notification = Notification.objects.create(
-            recipient=recipient,
-            sender=sender_user,
-            notification_type='message',
-            content=f'Вы получили новое сообщение от {sender_user.username}',
-            object_id=conversation.pk
-        )
-
-        # more debug
-        logger.debug(f"[notify] Created notification #{notification.pk} for user #{recipient.pk}")
-
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"notifications_{recipient.pk}",
-                {
-                    "type": "notification",
-                    "notification": NotificationSerializer(notification).data,
-                },
-            )
+@receiver(post_save, sender=Listing)
+def notify_followers_of_new_listing(sender, instance, created, **kwargs):
+    # подписчиков может быть очень много: рассылка целиком в Celery,
+    # после коммита, запрос на создание объявления её не ждёт
+    if not created or instance.status != 'active':
+        return
+    transaction.on_commit(lambda: fan_out_new_listing.delay(instance.pk))
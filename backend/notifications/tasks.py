@@ -0,0 +1,39 @@
+from celery import shared_task
+
+from config.redis_client import get_redis, release_lock
+from listings.models import Listing
+from .fanout import notify_followers_chunk
+from .unread import reconcile_unread_counts
+
+
+@shared_task
+def fan_out_new_listing(listing_id, after=0):
+    """
+    Уведомляет подписчиков продавца о новом объявлении. Одна задача —
+    одна пачка подписчиков (notifications/fanout.py); следующая пачка
+    ставится отдельной задачей, так что продавец со 100k подписчиков
+    не занимает воркер надолго, а повтор после падения дублирует
+    не больше одной пачки.
+    """
+    listing = Listing.objects.select_related('owner').filter(pk=listing_id, status='active').first()
+    if listing is None:
+        return
+    last = notify_followers_chunk(listing, after)
+    if last is not None:
+        fan_out_new_listing.delay(listing_id, last)
+
+
+@shared_task
+def reconcile_unread_counters():
+    """
+    Сверяет счётчики непрочитанного в Redis с Postgres
+    (notifications/unread.py): счётчики меняются без транзакции с БД.
+    """
+    lock = get_redis().lock('notifications:reconcile-unread', timeout=15 * 60)
+    if not lock.acquire(blocking=False):
+        return 'Reconciliation is already running'
+    try:
+        count = reconcile_unread_counts()
+    finally:
+        release_lock(lock)
+    return f'Reconciled unread counters of {count} users'
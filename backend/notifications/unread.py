@@ -0,0 +1,215 @@
+import logging
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+from redis import RedisError
+
+from config.redis_client import get_redis
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Хеш на пользователя: c:<conversation_id> — непрочитанные сообщения беседы,
+# n — непрочитанные уведомления, _ — метка «загружен из БД» (пустой хеш не хранится)
+UNREAD_KEY = 'unread:{user_id}'
+UNREAD_TTL = 7 * 24 * 60 * 60
+RECONCILE_CHUNK_SIZE = 500
+
+# Меняет поля только у уже загруженных счётчиков: иначе приращение к
+# несуществующему ключу дало бы заниженное значение вместо загрузки из БД.
+# ARGV — тройки (incr|set, поле, значение); возвращает HGETALL каждого ключа.
+_UPDATE_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        for j = 1, #ARGV, 3 do
+            if ARGV[j] == 'set' then
+                redis.call('HSET', key, ARGV[j + 1], ARGV[j + 2])
+            elseif redis.call('HINCRBY', key, ARGV[j + 1], ARGV[j + 2]) < 0 then
+                redis.call('HSET', key, ARGV[j + 1], 0)
+            end
+        end
+        result[i] = redis.call('HGETALL', key)
+    else
+        result[i] = {}
+    end
+end
+return result
+"""
+_update_script = None
+
+
+def unread_key(user_id):
+    return UNREAD_KEY.format(user_id=user_id)
+
+
+def _parse(fields):
+    conversations = {}
+    notifications = 0
+    for field, value in fields.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        value = int(value)
+        if field == 'n':
+            notifications = value
+        elif field.startswith('c:') and value > 0:
+            conversations[field[2:]] = value
+    return {
+        'messages': sum(conversations.values()),
+        'conversations': conversations,
+        'notifications': notifications,
+    }
+
+
+def _fields(counts):
+    fields = {'_': 1, 'n': counts['notifications']}
+    fields.update({f'c:{pk}': value for pk, value in counts['conversations'].items()})
+    return fields
+
+
+def load_unread_counts(user_ids):
+    """Счётчики из Postgres для пачки пользователей: {user_id: counts}."""
+    from chat.models import Message
+
+    counts = {
+        user_id: {'messages': 0, 'conversations': {}, 'notifications': 0}
+        for user_id in user_ids
+    }
+    messages = (
+        Message.objects
+        .filter(is_read=False, conversation__participants__in=user_ids)
+        # annotate после filter — тот же JOIN участников, а не отдельный подзапрос
+        .annotate(participant=F('conversation__participants'))
+        .exclude(sender_id=F('participant'))
+        .values_list('participant', 'conversation_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for user_id, conversation_id, count in messages:
+        counts[user_id]['conversations'][str(conversation_id)] = count
+        counts[user_id]['messages'] += count
+    notifications = (
+        Notification.objects.filter(recipient_id__in=user_ids, is_read=False)
+        .values_list('recipient_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for user_id, count in notifications:
+        counts[user_id]['notifications'] = count
+    return counts
+
+
+def _store(pipe, user_id, counts):
+    key = unread_key(user_id)
+    pipe.delete(key)
+    pipe.hset(key, mapping=_fields(counts))
+    pipe.expire(key, UNREAD_TTL)
+
+
+def get_unread_counts(user_id):
+    """
+    {'messages', 'conversations': {id: n}, 'notifications'} одним HGETALL.
+    Нет в Redis — считаем в Postgres и сохраняем; Redis недоступен — из Postgres.
+    """
+    try:
+        client = get_redis()
+        fields = client.hgetall(unread_key(user_id))
+        if fields:
+            return _parse(fields)
+        counts = load_unread_counts([user_id])[user_id]
+        pipe = client.pipeline()
+        _store(pipe, user_id, counts)
+        pipe.execute()
+        return counts
+    except RedisError as e:
+        logger.warning(f"[unread] Redis unavailable, counting in Postgres: {e}")
+        return load_unread_counts([user_id])[user_id]
+
+
+def _update(user_ids, operations):
+    """
+    Атомарно меняет счётчики пользователей (Lua, один round-trip) и
+    возвращает новые значения {user_id: counts} для загруженных в Redis.
+    Ошибки Redis не пробрасываются: расхождение исправит reconcile_unread_counts.
+    """
+    global _update_script
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    try:
+        if _update_script is None:
+            _update_script = get_redis().register_script(_UPDATE_SCRIPT)
+        args = [item for operation in operations for item in operation]
+        result = _update_script(keys=[unread_key(user_id) for user_id in user_ids], args=args)
+    except RedisError as e:
+        logger.warning(f"[unread] Counters not updated: {e}")
+        return {}
+    updated = {}
+    for user_id, flat in zip(user_ids, result):
+        if flat:
+            updated[user_id] = _parse(dict(zip(flat[::2], flat[1::2])))
+    return updated
+
+
+def message_created(conversation_id, recipient_ids):
+    # вместе с сообщением каждому получателю создаётся уведомление
+    return _update(recipient_ids, [('incr', f'c:{conversation_id}', 1), ('incr', 'n', 1)])
+
+
+def conversation_read(user_id, conversation_id, notifications_read=0):
+    operations = [('set', f'c:{conversation_id}', 0)]
+    if notifications_read:
+        operations.append(('incr', 'n', -notifications_read))
+    return _update([user_id], operations).get(user_id)
+
+
+def notifications_created(recipient_ids):
+    """recipient_ids — по id на каждое уведомление (повторы = несколько уведомлений)."""
+    by_amount = {}
+    for user_id, amount in Counter(recipient_ids).items():
+        by_amount.setdefault(amount, []).append(user_id)
+    for amount, user_ids in by_amount.items():
+        _update(user_ids, [('incr', 'n', amount)])
+
+
+def notifications_read(user_id, count=None):
+    """count прочитанных уведомлений; None — прочитаны все."""
+    operation = ('set', 'n', 0) if count is None else ('incr', 'n', -count)
+    return _update([user_id], [operation]).get(user_id)
+
+
+def push_unread_counts(user_id, counts):
+    """Новые счётчики в чат-сокеты пользователя (ChatConsumer.unread_counts)."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or counts is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(f"chat_{user_id}", {"type": "unread.counts", "counts": counts})
+    except Exception as e:
+        logger.warning(f"[unread] Push to user {user_id} failed: {e}")
+
+
+def reconcile_unread_counts():
+    """
+    Пересчитывает из Postgres все загруженные в Redis счётчики пачками:
+    исправляет расхождения после сбоев Redis, откатов транзакций и
+    изменений в обход приложения. Возвращает число пользователей.
+    """
+    client = get_redis()
+    prefix = unread_key('')
+    suffixes = (key.decode()[len(prefix):] for key in client.scan_iter(match=f'{prefix}*', count=1000))
+    user_ids = [int(suffix) for suffix in suffixes if suffix.isdigit()]
+    existing = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    for start in range(0, len(user_ids), RECONCILE_CHUNK_SIZE):
+        chunk = user_ids[start:start + RECONCILE_CHUNK_SIZE]
+        counts = load_unread_counts([user_id for user_id in chunk if user_id in existing])
+        pipe = client.pipeline(transaction=True)
+        for user_id in chunk:
+            if user_id in counts:
+                _store(pipe, user_id, counts[user_id])
+            else:
+                pipe.delete(unread_key(user_id))
+        pipe.execute()
+    return len(user_ids)
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Notification
 from .serializers import NotificationSerializer
+from .unread import notifications_read, push_unread_counts
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -14,12 +15,14 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'])
     def unread(self, request):
+        # страницами: счётчик для бейджа — /api/chat/unread-counts/
         notifications = Notification.objects.filter(
             recipient=request.user,
             is_read=False
-        )
-        serializer = self.get_serializer(notifications, many=True)
-        return Response(serializer.data)
+        ).select_related('recipient', 'sender')
+        page = self.paginate_queryset(notifications)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='mark_read', url_name='mark-read')
     def mark_read(self, request, pk=None):
@@ -34,8 +37,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
                 {'detail': 'Запрещено'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        notification.is_read = True
-        notification.save()
+        # условный UPDATE: повторная отметка не уменьшает счётчик ещё раз
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            push_unread_counts(request.user.pk, notifications_read(request.user.pk, 1))
         # возвращаем нужный вам формат
         return Response(
             {'is_read': True},
@@ -44,8 +48,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        Notification.objects.filter(
+        if Notification.objects.filter(
             recipient=request.user,
             is_read=False
-        ).update(is_read=True)
+        ).update(is_read=True):
+            push_unread_counts(request.user.pk, notifications_read(request.user.pk))
         return Response({'status': 'all notifications marked as read'})
\ No newline at end of file
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.6 on 2026-10-18 14:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_user_email_confirm_sent_at_user_email_confirm_token_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='subscription',
+            index=models.Index(fields=['following', 'follower'], name='subscription_following_idx'),
+        ),
+    ]
@@ -39,6 +39,10 @@ class Subscription(models.Model):
     
     class Meta:
         unique_together = ('follower', 'following')
+        indexes = [
+            # подписчики продавца по id: keyset-пачки рассылки (notifications/fanout.py)
+            models.Index(fields=['following', 'follower'], name='subscription_following_idx'),
+        ]
         verbose_name = _('subscription')
         verbose_name_plural = _('subscriptions')
     
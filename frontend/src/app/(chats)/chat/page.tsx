@@ -6,6 +6,7 @@ import { useAppDispatch, useAppSelector } from '@/store/store'
 import {
   fetchConversations,
   fetchMessages,
+  fetchOlderMessages,
   markConversationRead,
 } from '@/store/slices/chat/chatActions'
 import { markAllRead } from '@/store/slices/notifications/notificationsAction'
@@ -216,15 +217,26 @@ export default function MessagesPage() {
   }, [activeConversationId, dispatch, router])
 
   // 4) автоскролл
+  const currentHistory = activeConversationId !== null
+    ? messagesByConversation[activeConversationId]
+    : undefined
   const messagesForCurrent = useMemo(
-    () => activeConversationId !== null
-      ? messagesByConversation[activeConversationId]?.messages || []
-      : [],
-    [activeConversationId, messagesByConversation]
+    () => currentHistory?.messages || [],
+    [currentHistory]
   )
+  // только на новое последнее сообщение: подгрузка ранних не должна уводить вниз
+  const lastMessageId = messagesForCurrent[messagesForCurrent.length - 1]?.id
   useEffect(() => {
     scrollRef.current?.scrollIntoView({ behavior: 'smooth' })
-  }, [messagesForCurrent.length])
+  }, [lastMessageId])
+
+  const loadOlderMessages = () => {
+    if (activeConversationId === null || !messagesForCurrent.length) return
+    dispatch(fetchOlderMessages({
+      conversationId: activeConversationId,
+      before: messagesForCurrent[0].id,
+    }))
+  }
 
   // 5) токен-ошибки
   useEffect(() => {
@@ -313,7 +325,7 @@ export default function MessagesPage() {
                         <div className="flex items-center gap-2">
                           <div className="text-sm bg-muted p-2 rounded-md">
                             <div className="font-medium truncate max-w-[200px]">{conv.listing.title}</div>
-                            <div>{conv.listing.price?.toLocaleString()} ₽</div>
+                            <div>{conv.listing.price} {conv.listing.currency}</div>
                           </div>
                         </div>
                       )}
@@ -328,6 +340,18 @@ export default function MessagesPage() {
             <ScrollArea className="flex-1 p-4 overflow-y-auto">
               {activeConversationId !== null ? (
                 <>
+                  {currentHistory?.next && (
+                    <div className="flex justify-center mb-4">
+                      <Button
+                        variant="outline"
+                        size="sm"
+                        onClick={loadOlderMessages}
+                        disabled={currentHistory.loadingOlder}
+                      >
+                        {currentHistory.loadingOlder ? 'Загрузка...' : 'Загрузить более ранние'}
+                      </Button>
+                    </div>
+                  )}
                   <MessageList messages={messagesForCurrent} currentUserId={currentUserId} />
                   <div ref={scrollRef} />
                 </>
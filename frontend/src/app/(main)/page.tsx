@@ -3,7 +3,7 @@
 import { useEffect, Suspense } from 'react'
 import Link from "next/link"
 import { useAppDispatch, useAppSelector } from '@/store/store'
-import { fetchAds } from '@/store/slices/ads/adsAction'
+import { cursorFromLink, fetchAds } from '@/store/slices/ads/adsAction'
 import { setSearchTerm} from '@/store/slices/ads/adsSlice'
 import { Input } from '@/components/ui/input'
 import { Button } from '@/components/ui/button'
@@ -23,7 +23,6 @@ export default function HomePage() {
     minPrice,
     maxPrice,
     next,
-    page,
   } = useAppSelector((state) => state.ads)
 
   // При монтировании и при page-изменении подгружаем эту страницу
@@ -132,7 +131,7 @@ export default function HomePage() {
         {next && (
           <div className="flex justify-center mt-6">
             <Button
-              onClick={() => dispatch(fetchAds({ page: page + 1, append: true }))}
+              onClick={() => dispatch(fetchAds({ cursor: cursorFromLink(next), append: true }))}
               disabled={loading}
             >
               {loading ? 'Загрузка...' : 'Загрузить ещё'}
@@ -5,11 +5,38 @@ import { AuthErrorHandler } from '@/utils/authErrorHandler'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE ?? 'http://localhost:8000/api'
 
+// Курсор из ссылки next/previous ответа ленты (keyset-пагинация)
+export const cursorFromLink = (link: string | null): string | undefined =>
+  link ? new URL(link, 'http://localhost').searchParams.get('cursor') ?? undefined : undefined
+
+// Все страницы списка объявлений по курсорам next (избранное, объявления пользователя)
+export const fetchAllPages = async (
+  url: string,
+  params: Record<string, string> = {}
+): Promise<{ results: Ads[]; error: Response | null }> => {
+  const results: Ads[] = []
+  let cursor: string | undefined
+  do {
+    const query = new URLSearchParams({ ...params, page_size: '100' })
+    if (cursor) query.set('cursor', cursor)
+    const res = await TokenManager.fetchWithAuth(`${url}?${query.toString()}`)
+    if (!res.ok) return { results, error: res }
+    const data = await res.json()
+    if (!data || !Array.isArray(data.results)) {
+      throw new Error('Неожиданная структура данных от сервера')
+    }
+    results.push(...data.results)
+    cursor = cursorFromLink(data.next)
+  } while (cursor)
+  return { results, error: null }
+}
+
 // 🔁 Загрузка всех объявлений
 export const fetchAds = createAsyncThunk<
   { results: Ads[]; count: number; next: string | null; previous: string | null },
   {
     page?: number
+    cursor?: string
     category?: string
     city?: string
     searchTerm?: string
@@ -23,6 +50,7 @@ export const fetchAds = createAsyncThunk<
   async (
     {
       page = 1,
+      cursor,
       category,
       city,
       searchTerm,
@@ -32,7 +60,9 @@ export const fetchAds = createAsyncThunk<
     { rejectWithValue }
   ) => {
     const params = new URLSearchParams()
-    params.set('page', String(page))
+    // «Загрузить ещё» идёт по курсору; page нужен только для нумерованных страниц > 1
+    if (cursor) params.set('cursor', cursor)
+    else if (page > 1) params.set('page', String(page))
     params.set('page_size', String(12))
     if (category) params.set('category_slug', category)
     if (city) params.set('location', city)
@@ -94,8 +94,8 @@ const adsSlice = createSlice({
        // 1) Отфильтруем из пришедших results все объявления, где status === 'archived'
         const incomingNotArchived = results.filter(ad => ad.status !== 'archived');
 
-        if (append && page > 1) {
-          // 2) Если мы “дописываем” (append === true и page>1), то добавляем к уже имеющимся в state.items
+        if (append) {
+          // 2) Если мы “дописываем” (append === true, следующая страница по курсору), то добавляем к уже имеющимся в state.items
           //    только непроархивированные объявления из следующей страницы
           state.items = [...state.items, ...incomingNotArchived];
         } else {
@@ -2,6 +2,7 @@ import { createAsyncThunk } from '@reduxjs/toolkit'
 import { Ads } from '@/types/IAds'
 import { TokenManager } from '@/utils/tokenUtils'
 import { AuthErrorHandler } from '@/utils/authErrorHandler'
+import { fetchAllPages } from '@/store/slices/ads/adsAction'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE ?? 'http://localhost:8000/api'
 
@@ -19,21 +20,13 @@ export const fetchMyAds = createAsyncThunk<
   'ads/fetchMyAds',
   async (userId, { rejectWithValue }) => {
     try {
-      const res = await TokenManager.fetchWithAuth(`${API_BASE}/listings/`)
-      if (!res.ok) {
-        const msg = await AuthErrorHandler.handle(res)
+      // фильтр owner на сервере + все страницы по курсору (раньше — фильтр первой страницы ленты)
+      const { results, error } = await fetchAllPages(`${API_BASE}/listings/`, { owner: String(userId) })
+      if (error) {
+        const msg = await AuthErrorHandler.handle(error)
         return rejectWithValue(msg)
       }
-      const data = await res.json()
-
-      if (!data || !Array.isArray(data.results)) {
-        console.error('Неожиданная структура данных в fetchMyAds:', data)
-        return rejectWithValue('Неожиданная структура данных от сервера')
-      }
-
-      // Сразу фильтруем по owner.id, равному переданному userId
-      const myAds = data.results.filter((ad: Ads) => ad.owner.id === userId)
-      return myAds
+      return results
     } catch (err) {
       console.error('Не удалось выполнить fetchMyAds:', err)
       return rejectWithValue('Ошибка подключения')
@@ -9,6 +9,7 @@ import {
   ISendMessagePayload,
   ISendMessageResponse,
   IPaginatedConversations,
+  IMessagePage,
 } from '@/types/chatTypes'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE ? `${process.env.NEXT_PUBLIC_API_BASE}/chat` : 'http://localhost:8000/api/chat'
@@ -36,23 +37,59 @@ export const fetchConversations = createAsyncThunk<
 )
 
 
-// 2) Получить историю сообщений по conversationId
+// Страница истории: сообщения по порядку + есть ли более ранние
+export interface IMessageHistory {
+  messages: IMessage[]
+  next: string | null
+}
+
+const fetchMessagePage = async (url: string): Promise<IMessageHistory | Response> => {
+  const res = await TokenManager.fetchWithAuth(url)
+  if (!res.ok) return res
+  // страница приходит новыми первыми, лента рисуется по порядку
+  const page = (await res.json()) as IMessagePage
+  return { messages: page.results.reverse(), next: page.next }
+}
+
+// 2) Получить последнюю страницу истории сообщений по conversationId
 export const fetchMessages = createAsyncThunk<
-  IMessage[],
+  IMessageHistory,
   number,
   { rejectValue: string }
 >(
   'chat/fetchMessages',
   async (conversationId, { rejectWithValue }) => {
     try {
-      const res = await TokenManager.fetchWithAuth(
-        `${API_BASE}/conversations/${conversationId}/messages/`
+      const page = await fetchMessagePage(`${API_BASE}/conversations/${conversationId}/messages/`)
+      if (page instanceof Response) {
+        const msg = await AuthErrorHandler.handle(page)
+        return rejectWithValue(msg)
+      }
+      return page
+    } catch {
+      return rejectWithValue('Ошибка подключения')
+    }
+  }
+)
+
+
+// 2а) Подгрузить более ранние сообщения (?before=<id самого старого загруженного>)
+export const fetchOlderMessages = createAsyncThunk<
+  IMessageHistory,
+  { conversationId: number; before: number },
+  { rejectValue: string }
+>(
+  'chat/fetchOlderMessages',
+  async ({ conversationId, before }, { rejectWithValue }) => {
+    try {
+      const page = await fetchMessagePage(
+        `${API_BASE}/conversations/${conversationId}/messages/?before=${before}`
       )
-      if (!res.ok) {
-        const msg = await AuthErrorHandler.handle(res)
+      if (page instanceof Response) {
+        const msg = await AuthErrorHandler.handle(page)
         return rejectWithValue(msg)
       }
-      return (await res.json()) as IMessage[]
+      return page
     } catch {
       return rejectWithValue('Ошибка подключения')
     }
@@ -135,7 +172,7 @@ export const markConversationRead = createAsyncThunk<
   async (conversationId, { rejectWithValue }) => {
     try {
       const res = await TokenManager.fetchWithAuth(
-        `${process.env.NEXT_PUBLIC_API_BASE ?? 'http://localhost:8000/api'}/notifications/${conversationId}/mark_read/`,
+        `${API_BASE}/conversations/${conversationId}/mark_read/`,
         {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
@@ -3,6 +3,7 @@ import { IConversation, IMessage } from "@/types/chatTypes";
 import {
   fetchConversations,
   fetchMessages,
+  fetchOlderMessages,
   sendMessage,
   createConversation,
   receiveMessage,
@@ -12,6 +13,9 @@ import {
 interface IMessagesState {
   [conversationId: number]: {
     messages: IMessage[];
+    // ссылка на более ранние сообщения; null — история загружена целиком
+    next: string | null;
+    loadingOlder: boolean;
     loading: boolean;
     error: string | null;
   };
@@ -82,6 +86,8 @@ const chatSlice = createSlice({
         if (!state.messagesByConversation[convId]) {
           state.messagesByConversation[convId] = {
             messages: [],
+            next: null,
+            loadingOlder: false,
             loading: false,
             error: null,
           };
@@ -92,7 +98,8 @@ const chatSlice = createSlice({
       .addCase(fetchMessages.fulfilled, (state, action) => {
         const convId = action.meta.arg;
         state.messagesByConversation[convId].loading = false;
-        state.messagesByConversation[convId].messages = action.payload;
+        state.messagesByConversation[convId].messages = action.payload.messages;
+        state.messagesByConversation[convId].next = action.payload.next;
       })
       .addCase(fetchMessages.rejected, (state, action) => {
         const convId = action.meta.arg;
@@ -101,6 +108,34 @@ const chatSlice = createSlice({
           action.payload ?? action.error.message ?? null;
       });
 
+    // ─── fetchOlderMessages ─────────────────────────────────
+    builder
+      .addCase(fetchOlderMessages.pending, (state, action) => {
+        const msgsState = state.messagesByConversation[action.meta.arg.conversationId];
+        if (msgsState) {
+          msgsState.loadingOlder = true;
+          msgsState.error = null;
+        }
+      })
+      .addCase(fetchOlderMessages.fulfilled, (state, action) => {
+        const msgsState = state.messagesByConversation[action.meta.arg.conversationId];
+        if (!msgsState) return;
+        msgsState.loadingOlder = false;
+        msgsState.next = action.payload.next;
+        // более ранняя страница — в начало ленты, без дублей
+        const loaded = new Set(msgsState.messages.map((m) => m.id));
+        msgsState.messages = [
+          ...action.payload.messages.filter((m) => !loaded.has(m.id)),
+          ...msgsState.messages,
+        ];
+      })
+      .addCase(fetchOlderMessages.rejected, (state, action) => {
+        const msgsState = state.messagesByConversation[action.meta.arg.conversationId];
+        if (!msgsState) return;
+        msgsState.loadingOlder = false;
+        msgsState.error = action.payload ?? action.error.message ?? null;
+      });
+
     // ─── createConversation ─────────────────────────────────
     builder
       .addCase(createConversation.pending, (state) => {
@@ -133,6 +168,8 @@ const chatSlice = createSlice({
         if (!state.messagesByConversation[convId]) {
           state.messagesByConversation[convId] = {
             messages: [],
+            next: null,
+            loadingOlder: false,
             loading: false,
             error: null,
           };
@@ -164,6 +201,8 @@ const chatSlice = createSlice({
       } else {
         state.messagesByConversation[conversationId] = {
           messages: [message],
+          next: null,
+          loadingOlder: false,
           loading: false,
           error: null,
         };
@@ -2,6 +2,7 @@ import { createAsyncThunk } from '@reduxjs/toolkit'
 import { Ads } from '@/types/IAds'
 import { TokenManager } from '@/utils/tokenUtils'
 import { AuthErrorHandler } from '@/utils/authErrorHandler'
+import { fetchAllPages } from '@/store/slices/ads/adsAction'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE ?? 'http://localhost:8000/api'
 
@@ -12,20 +13,13 @@ export const fetchFavorites = createAsyncThunk<
   { rejectValue: string }
 >('favorites/fetchFavorites', async (_, { rejectWithValue }) => {
   try {
-    const res = await TokenManager.fetchWithAuth(`${API_BASE}/listings/favorites/`)
-    const data = await res.json()
-
-    if (!res.ok) {
-      const msg = await AuthErrorHandler.handle(res)
+    // избранное отдаётся страницами по курсору — собираем все
+    const { results, error } = await fetchAllPages(`${API_BASE}/listings/favorites/`)
+    if (error) {
+      const msg = await AuthErrorHandler.handle(error)
       return rejectWithValue(msg)
     }
-
-    const results = Array.isArray(data) ? data : data.results
-    if (!Array.isArray(results)) {
-      return rejectWithValue('Unexpected data format from server')
-    }
-
-    return results as Ads[]
+    return results
   } catch {
     return rejectWithValue('Ошибка подключения')
   }
@@ -1,5 +1,4 @@
 import { Users } from './IUsers';
-import { Ads } from './IAds';
 
 export interface IMessage {
     id: number;
@@ -18,16 +17,33 @@ export interface IMessage {
     created_at: string; // ISO‐строка
 }
   
+// Карточка объявления в беседе (ConversationListingSerializer)
+export interface IConversationListing {
+    id: number
+    slug: string
+    title: string
+    price: string
+    currency: string
+    status: string
+    image: string | null
+}
+
 export interface IConversation {
     id: number
     participants: Users[] // список участников (UserSerializer)
-    listing: Ads | null
+    listing: IConversationListing | null
     created_at: string
     updated_at: string
     last_message: IMessage | null
     unread_count: number
 }
 
+// Страница истории: GET /conversations/{id}/messages/?before=<id> (новые первыми)
+export interface IMessagePage {
+    next: string | null
+    results: IMessage[]
+}
+
 export interface IPaginatedConversations {
     count: number
     next: string | null